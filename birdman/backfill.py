@@ -0,0 +1,156 @@
+"""Parallel historical backfill of active streamers."""
+import asyncio
+
+
+class Backfill(object):
+    """Backfill crawls the history of a board(ActiveStreamer with `board_key`),
+    by splitting the post list into chunks of `chunk_pages` pages and crawling `workers` chunks at the same time.
+    Requests go through the streamer, so the per-host rate limits(and the shared session) apply.
+
+    Chunks are generated in the list order(newest first), each chunk after every previous one.
+    Posts pushed to the next page by new posts while crawling are generated only once,
+    and the progress is checkpointed after each chunk, so an interrupted backfill resumes where it stopped.
+
+    Range(`backfill` in the streamer config):
+        pages: [first, last] pages of the post list(last: None for the end of the list)
+        post_no: [low, high] range of post_no(either may be None)
+        dates: [since, until] range of written_at in ISO format(either may be None)
+        chunk_pages: pages per chunk, workers: chunks crawled at the same time
+        overlap: extra pages crawled after each chunk, for the posts pushed out of it by new posts
+
+    Methods:
+        stream: generate (name, post) of the backfill.
+    """
+
+    def __init__(self, streamer, store=None):
+        """
+        Args:
+            streamer (ActiveStreamer): streamer with `backfill` config, get_post_list() and fetch_post().
+            store (CheckpointStore): progress is saved and resumed if given.
+        """
+        if streamer.board_key is None:
+            raise ValueError("Backfill is not supported by streamer `%s`" % streamer.config.name)
+        obj = streamer.config.backfill or {}
+        self.streamer = streamer
+        self.name = 'backfill.' + streamer.config.name
+        self.store = store
+
+        self.first_page, self.last_page = obj.get('pages', [1, None])
+        self.low_post_no, self.high_post_no = obj.get('post_no', [None, None])
+        self.since, self.until = obj.get('dates', [None, None])
+        self.chunk_pages = max(1, int(obj.get('chunk_pages', 10)))
+        self.workers = max(1, int(obj.get('workers', 4)))
+        self.overlap = max(0, int(obj.get('overlap', 1)))
+
+        # Lowest post_no generated so far; every post at or above it is a duplicate
+        self._low = None
+        self.suppressed = 0
+
+    def _is_older(self, entry):
+        """True if `entry` is past the end of the range(and so is every following one).
+        """
+        if self.low_post_no is not None and entry['post_no'] < self.low_post_no:
+            return True
+        return self.since is not None and entry['written_at'] is not None and entry['written_at'] < self.since
+
+    def _is_newer(self, entry):
+        if self.high_post_no is not None and entry['post_no'] > self.high_post_no:
+            return True
+        return self.until is not None and entry['written_at'] is not None and entry['written_at'] > self.until
+
+    def _pages(self, index):
+        first = self.first_page + index * self.chunk_pages
+        last = first + self.chunk_pages - 1
+        if self.last_page is not None:
+            last = min(last, self.last_page)
+        return first, last
+
+    async def _crawl_chunk(self, index):
+        """Crawl the pages of the chunk `index`.
+
+        Returns:
+            posts (list), end (bool): end is True if no chunk after this one is needed.
+        """
+        first, last = self._pages(index)
+        board = getattr(self.streamer.config, self.streamer.board_key)
+        entries = self.streamer.get_post_list(
+            board, first_page=first, last_page=last + self.overlap, conditional=False
+        )
+        posts = []
+        count = 0
+        end = self.last_page is not None and last >= self.last_page
+        try:
+            async for entry in entries:
+                count += 1
+                if self._is_older(entry):
+                    end = True
+                    break
+                if self._is_newer(entry) or (self._low is not None and entry['post_no'] >= self._low):
+                    continue
+                post = await self.streamer.fetch_post(entry['url'], skip_crawled=False)
+                if isinstance(post, dict):
+                    posts.append(post)
+        finally:
+            await entries.aclose()
+        return posts, end or count == 0
+
+    def _save(self, next_page, done):
+        if self.store is not None:
+            self.store.save(self.name, self._low or 0, None, {'next_page': next_page, 'done': done})
+
+    async def stream(self):
+        """Crawl the chunks, and generate (name, post) in the list order.
+        """
+        logger = self.streamer.logger
+        if self.store is not None:
+            checkpoint = self.store.load(self.name)
+            if checkpoint is not None:
+                if checkpoint['progress']['done']:
+                    logger.info("Backfill is already done")
+                    return
+                self.first_page = checkpoint['progress']['next_page']
+                self._low = checkpoint['post_id'] or None
+                logger.info("Resume backfill from page %d" % self.first_page)
+
+        pending = {}  # task -> chunk index
+        finished = {}  # chunk index -> posts, until every previous chunk is generated
+        next_index = 0  # first chunk not generated yet
+        scheduled = 0
+        end_at = None  # index of the last chunk
+        try:
+            while True:
+                while len(pending) < self.workers and (end_at is None or scheduled <= end_at):
+                    pending[asyncio.ensure_future(self._crawl_chunk(scheduled))] = scheduled
+                    scheduled += 1
+                if not pending:
+                    break
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=pending.get):
+                    if task not in pending:
+                        continue  # cancelled after an earlier chunk reached the end
+                    index = pending.pop(task)
+                    posts, end = task.result()
+                    finished[index] = posts
+                    if end and (end_at is None or index < end_at):
+                        end_at = index
+                        for other, other_index in list(pending.items()):
+                            if other_index > end_at:
+                                other.cancel()
+                                del pending[other]
+
+                while next_index in finished and (end_at is None or next_index <= end_at):
+                    for post in finished.pop(next_index):
+                        if self._low is not None and post['post_no'] >= self._low:
+                            self.suppressed += 1
+                            continue
+                        self._low = post['post_no']
+                        yield self.streamer.config.name, post
+                    first, last = self._pages(next_index)
+                    self._save(last + 1, next_index == end_at)
+                    logger.info("Backfill: pages %d-%d are done" % (first, last))
+                    next_index += 1
+        finally:
+            for task in pending:
+                task.cancel()
+        logger.info("Backfill is done(%d duplicates suppressed)" % self.suppressed)
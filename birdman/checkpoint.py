@@ -0,0 +1,124 @@
+"""Durable checkpoint store for the crawl cursors of active streamers."""
+import json
+import sqlite3
+import time
+
+from abc import ABCMeta, abstractmethod
+
+
+class CheckpointStore(object):
+    """CheckpointStore keeps the crawl cursor(config.current_*) of each streamer by its name.
+    A single store is shared by all streamers of the process;
+    save() only stages a checkpoint, and flush() commits every staged one at once.
+
+    Methods:
+        load: returns the last checkpoint of a streamer(staged, or else committed).
+        save: stages a checkpoint of a streamer.
+        flush: commits staged checkpoints atomically.
+        close: flushes and closes the store.
+    """
+
+    __metaclass__ = ABCMeta
+
+    def __init__(self):
+        self._staged = {}
+
+    def load(self, name):
+        """Return dict(post_id, datetime, progress) of the streamer `name`, or None.
+        A checkpoint staged but not flushed yet is newer than the committed one.
+        """
+        if name in self._staged:
+            post_id, datetime, progress = self._staged[name]
+            return {'post_id': post_id, 'datetime': datetime, 'progress': progress}
+        return self._load(name)
+
+    @abstractmethod
+    def _load(self, name):
+        '''Must override.
+        Return the committed dict(post_id, datetime, progress) of the streamer `name`, or None.
+        '''
+        pass
+
+    def save(self, name, post_id, datetime, progress=None):
+        """Stage a checkpoint; it is durable after the next flush().
+
+        Args:
+            name (str): streamer name(config.name)
+            post_id (int), datetime (str): crawl cursor(config.current_*)
+            progress (dict): posts already yielded by an unfinished epoch(None if finished)
+        """
+        self._staged[name] = (post_id, datetime, progress)
+
+    def flush(self):
+        if self._staged:
+            self._commit(self._staged)
+            self._staged = {}
+
+    @abstractmethod
+    def _commit(self, checkpoints):
+        '''Must override.
+        Write `checkpoints`({name: (post_id, datetime, progress)}) in a single transaction.
+        '''
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """CheckpointStore in a SQLite database file.
+    """
+
+    def __init__(self, path):
+        super(SQLiteCheckpointStore, self).__init__()
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint ("
+                "name TEXT PRIMARY KEY, post_id INTEGER, datetime TEXT, progress TEXT, updated_at REAL)"
+            )
+
+    def _load(self, name):
+        row = self._conn.execute(
+            "SELECT post_id, datetime, progress FROM checkpoint WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'post_id': row[0],
+            'datetime': row[1],
+            'progress': json.loads(row[2]) if row[2] is not None else None,
+        }
+
+    def _commit(self, checkpoints):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint VALUES (?, ?, ?, ?, ?)",
+                [
+                    (name, post_id, datetime, json.dumps(progress) if progress is not None else None, now)
+                    for name, (post_id, datetime, progress) in checkpoints.items()
+                ]
+            )
+
+    def close(self):
+        super(SQLiteCheckpointStore, self).close()
+        self._conn.close()
+
+
+_stores = {
+    'sqlite': SQLiteCheckpointStore,
+}
+
+
+def get_checkpoint_store(obj):
+    """Create a checkpoint store from the config.
+
+    Args:
+        obj (dict): result of YAML parsing(`checkpoint` in the `global` section).
+                    {backend: 'sqlite'(default), path: database file}
+    """
+    backend = obj.get('backend', 'sqlite')
+    if backend not in _stores:
+        raise ValueError("`checkpoint.backend` must be one of: %s" % ', '.join(sorted(_stores)))
+    return _stores[backend](obj.get('path', 'birdman_checkpoint.sqlite'))
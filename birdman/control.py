@@ -0,0 +1,76 @@
+"""Local HTTP endpoint to add or remove streamers and listeners of a running Birdman.
+
+    GET    /streamers          names of the streamers
+    POST   /streamers          add a streamer; JSON body is its config(with `class`), as in the YAML file
+    DELETE /streamers/{name}   stop and close a streamer
+    GET    /listeners          names of the listeners
+    POST   /listeners          add a listener; JSON body is its config(with `class`)
+    DELETE /listeners/{name}   remove and close a listener
+
+Streamer configs get the `global` section of the streamers, as in init_birdman_from_yaml().
+Errors are answered with {"error": message}.
+"""
+from aiohttp import web
+
+from birdman.listen import get_listener
+from birdman.stream import get_streamer
+
+
+def _error(status, message):
+    return web.json_response({'error': message}, status=status)
+
+
+async def serve(birdman, host='127.0.0.1', port=9109):
+    """Serve the control endpoint of `birdman`. Returns the aiohttp AppRunner(cleanup() to stop).
+    """
+    async def list_streamers(request):
+        return web.json_response([streamer.config.name for streamer in birdman._streamers])
+
+    async def add_streamer(request):
+        try:
+            obj = {**await request.json(), **birdman._config_obj}
+            streamer = get_streamer(obj['class'])(obj)
+            birdman.add_streamer(streamer)
+        except (ValueError, KeyError, TypeError) as e:
+            return _error(400, repr(e))
+        return web.json_response({'name': streamer.config.name}, status=201)
+
+    async def remove_streamer(request):
+        try:
+            await birdman.remove_streamer(request.match_info['name'])
+        except KeyError as e:
+            return _error(404, repr(e))
+        except ValueError as e:
+            return _error(400, repr(e))
+        return web.json_response({'name': request.match_info['name']})
+
+    async def list_listeners(request):
+        return web.json_response([listener.name for listener in birdman._listeners])
+
+    async def add_listener(request):
+        try:
+            obj = await request.json()
+            listener = get_listener(obj['class'])(obj)
+            birdman.add_listener(listener)
+        except (ValueError, KeyError, TypeError) as e:
+            return _error(400, repr(e))
+        return web.json_response({'name': listener.name}, status=201)
+
+    async def remove_listener(request):
+        try:
+            await birdman.remove_listener(request.match_info['name'])
+        except KeyError as e:
+            return _error(404, repr(e))
+        return web.json_response({'name': request.match_info['name']})
+
+    app = web.Application()
+    app.router.add_get('/streamers', list_streamers)
+    app.router.add_post('/streamers', add_streamer)
+    app.router.add_delete('/streamers/{name}', remove_streamer)
+    app.router.add_get('/listeners', list_listeners)
+    app.router.add_post('/listeners', add_listener)
+    app.router.add_delete('/listeners/{name}', remove_listener)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
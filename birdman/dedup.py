@@ -0,0 +1,155 @@
+"""Bounded-memory deduplication of the results emitted by streamers."""
+import base64
+import hashlib
+import json
+import math
+import os
+from collections import OrderedDict
+
+
+class BloomFilter(object):
+    """Bloom filter sized for `capacity` keys at the false positive rate `error_rate`.
+
+    Methods:
+        add: add a key.
+        __contains__: True if the key may have been added(False if never added).
+    """
+
+    def __init__(self, capacity, error_rate, bits=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing(Kirsch & Mitzenmacher) from a single digest
+        digest = hashlib.blake2b(key.encode('UTF-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class Deduplicator(object):
+    """Deduplicator drops results already emitted, within a fixed amount of memory.
+
+    Keys are (streamer name, post_no) of the results(and `refresh` of comment deltas, birdman.refresh);
+    results without `post_no` always pass.
+    The most recent keys are kept exactly in a LRU, and every key is also added to a Bloom filter
+    that catches the older ones. The filter is rotated in two generations of `bloom_capacity` keys,
+    so memory stays fixed and the false positive rate stays below about `error_rate` x 2.
+
+    Methods:
+        seen: check and record a result; True if it is a duplicate.
+        stats: numbers of checked and suppressed results.
+        save: persist the state to `path`.
+    """
+
+    def __init__(self, obj=None):
+        """
+        Args:
+            obj (dict): result of YAML parsing(`dedup` in the `global` section).
+        """
+        obj = obj or {}
+        # Number of recent keys kept exactly
+        self.capacity = int(obj.get('capacity', 100000))
+        # Number of keys per Bloom filter generation, and its false positive rate
+        self.bloom_capacity = int(obj.get('bloom_capacity', 1000000))
+        self.error_rate = float(obj.get('error_rate', 0.001))
+        if not 0 < self.error_rate < 1:
+            raise ValueError("`dedup.error_rate` must be between 0 and 1")
+        # If given, the state is loaded from and saved to this file across restarts
+        self.path = obj.get('path', None)
+
+        self._recent = OrderedDict()
+        self._current = BloomFilter(self.bloom_capacity, self.error_rate)
+        self._previous = None
+        self.checked = 0
+        self.suppressed = 0
+
+        if self.path is not None and os.path.exists(self.path):
+            self._load()
+
+    @staticmethod
+    def key(name, result):
+        """Dedup key of a result, or None if it cannot be deduplicated.
+        """
+        if not isinstance(result, dict) or result.get('post_no') is None:
+            return None
+        if 'refresh' in result:
+            return '%s:%s:%s' % (name, result['post_no'], result['refresh'])
+        return '%s:%s' % (name, result['post_no'])
+
+    def seen(self, name, result):
+        """Check whether `result` from the streamer `name` was already emitted, and record it.
+        """
+        key = self.key(name, result)
+        if key is None:
+            return False
+        self.checked += 1
+
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            self.suppressed += 1
+            return True
+        if key in self._current or (self._previous is not None and key in self._previous):
+            self.suppressed += 1
+            return True
+
+        self._record(key)
+        return False
+
+    def _record(self, key):
+        self._recent[key] = None
+        if len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+        if self._current.count >= self.bloom_capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.bloom_capacity, self.error_rate)
+        self._current.add(key)
+
+    @property
+    def stats(self):
+        return {'checked': self.checked, 'suppressed': self.suppressed}
+
+    def _load(self):
+        with open(self.path, 'r', encoding='UTF-8') as file:
+            state = json.load(file)
+        if (state['bloom_capacity'], state['error_rate']) != (self.bloom_capacity, self.error_rate):
+            # Filters of a different size cannot be reused; keep the exact keys only
+            for key in state['recent'][-self.capacity:]:
+                self._record(key)
+            return
+        for key in state['recent'][-self.capacity:]:
+            self._recent[key] = None
+        self._current = BloomFilter(self.bloom_capacity, self.error_rate, base64.b64decode(state['current']))
+        self._current.count = state['current_count']
+        if state['previous'] is not None:
+            self._previous = BloomFilter(self.bloom_capacity, self.error_rate, base64.b64decode(state['previous']))
+            self._previous.count = self.bloom_capacity
+
+    def save(self):
+        """Write the state to `path`(atomically, by replacing the file).
+        """
+        if self.path is None:
+            return
+        state = {
+            'bloom_capacity': self.bloom_capacity,
+            'error_rate': self.error_rate,
+            'recent': list(self._recent),
+            'current': base64.b64encode(bytes(self._current.bits)).decode('ascii'),
+            'current_count': self._current.count,
+            'previous': base64.b64encode(bytes(self._previous.bits)).decode('ascii') if self._previous else None,
+        }
+        with open(self.path + '.tmp', 'w', encoding='UTF-8') as file:
+            json.dump(state, file)
+        os.replace(self.path + '.tmp', self.path)
@@ -1,8 +1,35 @@
 class ParserUpdateRequiredError(Exception):
     def __init__(self, name, msg):
         super(ParserUpdateRequiredError, self).__init__("%s | %s"%(name, msg))
+        self.name = name
+        self.msg = msg
+
+    def __reduce__(self):
+        # Keep picklable, since parsers may raise it inside a worker process
+        return (ParserUpdateRequiredError, (self.name, self.msg))
 
 
 class UnknownError(Exception):
     def __init__(self, name):
-        super(UnknownError, self).__init__("%s | %s"%(name, "Unknown error. Generate issues in our Github repository for support."))
\ No newline at end of file
+        super(UnknownError, self).__init__("%s | %s"%(name, "Unknown error. Generate issues in our Github repository for support."))
+        self.name = name
+
+    def __reduce__(self):
+        return (UnknownError, (self.name,))
+
+class StreamEndedError(Exception):
+    def __init__(self, name):
+        super(StreamEndedError, self).__init__("%s | %s"%(name, "Stream has ended unexpectedly."))
+        self.name = name
+
+    def __reduce__(self):
+        return (StreamEndedError, (self.name,))
+
+class CacheMissError(Exception):
+    def __init__(self, name, url):
+        super(CacheMissError, self).__init__("%s | %s"%(name, "Not recorded in the HTTP cache: " + url))
+        self.name = name
+        self.url = url
+
+    def __reduce__(self):
+        return (CacheMissError, (self.name, self.url))
@@ -0,0 +1,68 @@
+"""Record/replay HTTP cache for active streamers."""
+import json
+import sqlite3
+import time
+import zlib
+
+from multidict import CIMultiDict
+
+
+class HTTPCache(object):
+    """HTTPCache records the responses of ActiveStreamer.request() into a SQLite file,
+    and replays them without any network access.
+
+    The latest 200 response of each URL is kept(URL, status, headers and zlib-compressed body).
+    In replay mode, page_interval and the rate limits are skipped, so recorded traffic is re-run at memory speed;
+    a URL that was never recorded raises birdman.error.CacheMissError(the end of the recorded post list).
+
+    Methods:
+        get: recorded (status, headers, text) of a URL, or None.
+        put: record a response.
+        close: commit and close the file.
+    """
+
+    def __init__(self, obj):
+        """
+        Args:
+            obj (dict): result of YAML parsing(`http_cache` in the `global` section).
+                        {mode: 'record' or 'replay', path: database file, commit_every: responses}
+        """
+        self.mode = obj.get('mode', 'record')
+        if self.mode not in ('record', 'replay'):
+            raise ValueError("`http_cache.mode` must be either 'record' or 'replay'")
+        self.path = obj.get('path', 'birdman_http_cache.sqlite')
+        self.commit_every = obj.get('commit_every', 100)
+
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response ("
+                "url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, recorded_at REAL)"
+            )
+        self._uncommitted = 0
+
+    @property
+    def replay(self):
+        return self.mode == 'replay'
+
+    def get(self, url):
+        row = self._conn.execute("SELECT status, headers, body FROM response WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return row[0], CIMultiDict(json.loads(row[1])), zlib.decompress(row[2]).decode('UTF-8')
+
+    def put(self, url, status, headers, text):
+        if self.replay or status != 200:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?)",
+            (url, status, json.dumps(list(headers.items())), zlib.compress(text.encode('UTF-8')), time.time())
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
@@ -0,0 +1,71 @@
+"""Batched IPC channel from streamer worker processes to the listener process."""
+import asyncio
+import queue
+
+
+class BatchSender(object):
+    """Sends (name, item) from a worker process in batches over a multiprocessing.Queue.
+
+    A batch is sent when it has `batch_size` items, or `batch_interval` seconds after its first item.
+    The queue is bounded, so a slow listener process blocks send()(backpressure to the streamers).
+    """
+
+    def __init__(self, channel, batch_size=64, batch_interval=0.2):
+        """
+        Args:
+            channel (multiprocessing.Queue): bounded queue shared with the listener process.
+        """
+        self.channel = channel
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._batch = []
+        self._timer = None
+        self._lock = asyncio.Lock()  # keeps the order of batches
+
+    async def _put(self, batch):
+        # Queue.put blocks while the queue is full; keep the event loop running meanwhile
+        async with self._lock:
+            await asyncio.get_event_loop().run_in_executor(None, self.channel.put, batch)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_interval)
+        self._timer = None
+        await self.flush()
+
+    async def send(self, name, item):
+        self._batch.append((name, item))
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.ensure_future(self._flush_later())
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._batch:
+            batch, self._batch = self._batch, []
+            await self._put(batch)
+
+    async def close(self):
+        """Send the rest, and tell the listener process that this worker has finished.
+        """
+        await self.flush()
+        await self._put(None)
+
+
+async def receive_batches(channel, senders, poll_interval=0.5):
+    """Generate (name, item) sent by `senders` BatchSenders over `channel`, until every one is closed.
+    """
+    loop = asyncio.get_event_loop()
+    while senders > 0:
+        try:
+            # Time out regularly, so that the reader thread never outlives the loop
+            batch = await loop.run_in_executor(None, channel.get, True, poll_interval)
+        except queue.Empty:
+            continue
+        if batch is None:
+            senders -= 1
+            continue
+        for name, item in batch:
+            yield name, item
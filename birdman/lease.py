@@ -0,0 +1,373 @@
+"""Lease-based assignment of boards to Birdman nodes.
+
+Every node claims boards from the same board list through a shared lease store;
+a board is crawled only by the node holding its lease, and the lease of a dead node
+expires after `ttl` seconds so that another node takes the board over.
+
+Run the TCP stand-in lease service with:
+
+    python -m birdman.lease --host 0.0.0.0 --port 7070
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import math
+import random
+import socket
+import sqlite3
+import time
+
+from abc import ABCMeta, abstractmethod
+
+
+logger = logging.getLogger('birdman.lease')
+
+
+class LeaseStore(object):
+    """LeaseStore keeps (board -> node, expiry) and heartbeats of nodes.
+
+    Methods:
+        acquire: take the lease of a free(or expired) board.
+        renew: extend the leases a node still holds.
+        release: give the leases up.
+        heartbeat: mark a node alive, and return the number of live nodes.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    async def acquire(self, board, node, ttl):
+        '''Must override. Return True if `node` holds the lease of `board` for `ttl` seconds.
+        '''
+        pass
+
+    @abstractmethod
+    async def renew(self, boards, node, ttl):
+        '''Must override. Extend the leases of `boards` held by `node`; return the boards still held.
+        '''
+        pass
+
+    @abstractmethod
+    async def release(self, boards, node):
+        '''Must override.
+        '''
+        pass
+
+    @abstractmethod
+    async def heartbeat(self, node, ttl):
+        '''Must override.
+        '''
+        pass
+
+    async def close(self):
+        pass
+
+
+class SQLiteLeaseStore(LeaseStore):
+    """LeaseStore in a SQLite database file, for nodes on a single host(or a reliable shared file system).
+    SQLite's file lock makes every operation atomic across processes.
+    Operations may wait for the lock(up to 10 seconds), so they run in a thread of their own, off the event loop.
+    """
+
+    def __init__(self, path):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS lease (board TEXT PRIMARY KEY, node TEXT, expires_at REAL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS node (node TEXT PRIMARY KEY, expires_at REAL)")
+
+    def _transaction(self, func, *args):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(time.time(), *args)
+            self._conn.execute("COMMIT")
+            return result
+        except:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _acquire(self, now, board, node, ttl):
+        row = self._conn.execute("SELECT node, expires_at FROM lease WHERE board = ?", (board,)).fetchone()
+        if row is not None and row[0] != node and row[1] > now:
+            return False
+        self._conn.execute("INSERT OR REPLACE INTO lease VALUES (?, ?, ?)", (board, node, now + ttl))
+        return True
+
+    def _renew(self, now, boards, node, ttl):
+        held = []
+        for board in boards:
+            row = self._conn.execute("SELECT node, expires_at FROM lease WHERE board = ?", (board,)).fetchone()
+            if row is not None and row[0] == node and row[1] > now:
+                self._conn.execute("UPDATE lease SET expires_at = ? WHERE board = ?", (now + ttl, board))
+                held.append(board)
+        return held
+
+    def _release(self, now, boards, node):
+        self._conn.executemany(
+            "DELETE FROM lease WHERE board = ? AND node = ?", [(board, node) for board in boards]
+        )
+
+    def _heartbeat(self, now, node, ttl):
+        self._conn.execute("INSERT OR REPLACE INTO node VALUES (?, ?)", (node, now + ttl))
+        self._conn.execute("DELETE FROM node WHERE expires_at <= ?", (now,))
+        return self._conn.execute("SELECT COUNT(*) FROM node").fetchone()[0]
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._transaction, func, *args)
+
+    async def acquire(self, board, node, ttl):
+        return await self._run(self._acquire, board, node, ttl)
+
+    async def renew(self, boards, node, ttl):
+        return await self._run(self._renew, boards, node, ttl)
+
+    async def release(self, boards, node):
+        await self._run(self._release, boards, node)
+
+    async def heartbeat(self, node, ttl):
+        return await self._run(self._heartbeat, node, ttl)
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+        self._executor.shutdown(wait=False)
+
+
+class TCPLeaseStore(LeaseStore):
+    """Client of the TCP stand-in lease service(LeaseServer); a JSON object per line.
+    """
+
+    def __init__(self, host, port, timeout=5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader = self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def _call(self, **request):
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    self._reader, self._writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout
+                    )
+                self._writer.write((json.dumps(request) + '\n').encode('UTF-8'))
+                line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+                if not line:
+                    raise ConnectionError("Lease service has closed the connection")
+                response = json.loads(line)
+                if 'error' in response:
+                    raise ValueError("Lease service error: %s" % response['error'])
+                return response['result']
+            except:
+                # Reconnect on the next call
+                if self._writer is not None:
+                    self._writer.close()
+                self._reader = self._writer = None
+                raise
+
+    async def acquire(self, board, node, ttl):
+        return await self._call(op='acquire', board=board, node=node, ttl=ttl)
+
+    async def renew(self, boards, node, ttl):
+        return await self._call(op='renew', boards=boards, node=node, ttl=ttl)
+
+    async def release(self, boards, node):
+        await self._call(op='release', boards=boards, node=node)
+
+    async def heartbeat(self, node, ttl):
+        return await self._call(op='heartbeat', node=node, ttl=ttl)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+class LeaseServer(object):
+    """TCP stand-in lease service keeping the leases in memory.
+    """
+
+    def __init__(self):
+        self._leases = {}  # board -> (node, expires_at)
+        self._nodes = {}  # node -> expires_at
+
+    def handle(self, request):
+        now = time.monotonic()
+        op = request['op']
+        if op == 'acquire':
+            node, expires_at = self._leases.get(request['board'], (None, 0))
+            if node not in (None, request['node']) and expires_at > now:
+                return False
+            self._leases[request['board']] = (request['node'], now + request['ttl'])
+            return True
+        if op == 'renew':
+            held = []
+            for board in request['boards']:
+                node, expires_at = self._leases.get(board, (None, 0))
+                if node == request['node'] and expires_at > now:
+                    self._leases[board] = (node, now + request['ttl'])
+                    held.append(board)
+            return held
+        if op == 'release':
+            for board in request['boards']:
+                if self._leases.get(board, (None, 0))[0] == request['node']:
+                    del self._leases[board]
+            return None
+        if op == 'heartbeat':
+            self._nodes[request['node']] = now + request['ttl']
+            self._nodes = {node: expires_at for node, expires_at in self._nodes.items() if expires_at > now}
+            return len(self._nodes)
+        raise ValueError("Unknown lease operation `%s`" % op)
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = {'result': self.handle(json.loads(line))}
+                except (KeyError, ValueError) as e:
+                    response = {'error': repr(e)}
+                writer.write((json.dumps(response) + '\n').encode('UTF-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self._serve_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+_stores = {
+    'sqlite': lambda obj: SQLiteLeaseStore(obj.get('path', 'birdman_lease.sqlite')),
+    'tcp': lambda obj: TCPLeaseStore(obj.get('host', 'localhost'), obj.get('port', 7070)),
+}
+
+
+def get_lease_store(obj):
+    """Create a lease store from the config(`lease` in the `global` section; see LeaseCoordinator).
+    """
+    backend = obj.get('backend', 'sqlite')
+    if backend not in _stores:
+        raise ValueError("`lease.backend` must be one of: %s" % ', '.join(sorted(_stores)))
+    return _stores[backend](obj)
+
+
+class LeaseCoordinator(object):
+    """LeaseCoordinator claims boards for this node and keeps their leases.
+
+    Each node claims at most its fair share(boards / live nodes, rounded up),
+    and gives the extra boards up when more nodes join.
+    If the leases cannot be renewed in time, every board is dropped since another node may take it over.
+
+    Config(`lease` in the `global` section):
+        backend: 'sqlite'(path) or 'tcp'(host, port)
+        node: name of this node(default: hostname and a random suffix)
+        ttl: seconds until the leases of a dead node expire
+        renew_interval: seconds between renewals(less than ttl)
+    """
+
+    def __init__(self, candidates, on_claim, on_lose, obj):
+        """
+        Args:
+            candidates (dict): board key -> anything passed to `on_claim`.
+            on_claim (function): called with (key, candidate) when a board is claimed.
+            on_lose (coroutine function): called with the key when a board is lost or released.
+            obj (dict): result of YAML parsing(`lease` in the `global` section).
+        """
+        self.candidates = candidates
+        self.on_claim = on_claim
+        self.on_lose = on_lose
+        self.store = get_lease_store(obj)
+        self.node = obj.get('node', '%s-%06x' % (socket.gethostname(), random.getrandbits(24)))
+        self.ttl = obj.get('ttl', 30)
+        self.renew_interval = obj.get('renew_interval', self.ttl / 3)
+        if self.renew_interval >= self.ttl:
+            raise ValueError("`lease.renew_interval` must be less than `lease.ttl`")
+
+        self.owned = set()
+        self._valid_until = 0
+
+    async def _lose(self, keys):
+        for key in keys:
+            self.owned.discard(key)
+            try:
+                await self.on_lose(key)
+            except Exception as e:
+                logger.error("Failed to stop board `%s`: %s" % (key, repr(e)))
+
+    async def _claim(self, key):
+        if not await self.store.acquire(key, self.node, self.ttl):
+            return
+        try:
+            self.on_claim(key, self.candidates[key])
+        except Exception as e:
+            # e.g. a bad config of this board; give it up, so that it does not stay leased by nobody crawling it
+            logger.error("Failed to claim board `%s`: %s" % (key, repr(e)))
+            await self.store.release([key], self.node)
+            return
+        self.owned.add(key)
+
+    async def _round(self):
+        nodes = await self.store.heartbeat(self.node, self.ttl)
+        started_at = time.monotonic()
+        held = set(await self.store.renew(sorted(self.owned), self.node, self.ttl))
+        self._valid_until = started_at + self.ttl
+        await self._lose(self.owned - held)
+
+        share = int(math.ceil(len(self.candidates) / max(1, nodes)))
+        if len(self.owned) > share:
+            extra = sorted(self.owned)[share:]
+            await self.store.release(extra, self.node)
+            await self._lose(extra)
+        free = [key for key in self.candidates if key not in self.owned]
+        random.shuffle(free)  # less contention between the nodes
+        for key in free:
+            if len(self.owned) >= share:
+                break
+            await self._claim(key)
+
+    async def run(self):
+        """Claim and renew the leases until cancelled.
+        """
+        while True:
+            try:
+                await self._round()
+            except (OSError, ConnectionError, asyncio.TimeoutError, sqlite3.Error) as e:
+                logger.warning("Lease store is not available: %s" % repr(e))
+            except Exception as e:
+                # e.g. an error of the lease service; retried in the next round
+                logger.error("Lease round has failed: %s" % repr(e))
+            if self.owned and time.monotonic() >= self._valid_until:
+                # Other nodes may have taken the boards over already
+                logger.warning("Leases have expired; stop crawling %d boards" % len(self.owned))
+                await self._lose(list(self.owned))
+            await asyncio.sleep(self.renew_interval)
+
+    async def close(self):
+        """Release every lease, so that other nodes take the boards over at once.
+        """
+        if self.owned:
+            try:
+                await self.store.release(sorted(self.owned), self.node)
+            except Exception as e:
+                logger.warning("Failed to release the leases: %s" % repr(e))
+            self.owned = set()
+        await self.store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TCP stand-in lease service for Birdman nodes")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=7070)
+    args = parser.parse_args()
+    asyncio.run(LeaseServer().serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
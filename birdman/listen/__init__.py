@@ -2,31 +2,27 @@
 
 from __future__ import absolute_import
 
-import os
-
 from birdman.listen.base import BaseListener
+from birdman.registry import LazyRegistry
 
-# registration decorator for listeners (accessed by config['class'])
-_listeners = {}
-def register_listener(name):
-    def decorator(cls):
-        if not issubclass(cls, BaseListener):
-            raise ValueError("decorator `register_listener` must be used for BaseListener subclass")
-        _listeners[name] = cls
-        return cls
-    return decorator
-
+# Listener classes (accessed by config['class']).
+# Modules are imported on first use only; plugins register through the `birdman.listeners` entry points.
+_listeners = LazyRegistry(BaseListener, 'birdman.listeners', {
+    'text': 'birdman.listen.text',
+}, decorator_name='register_listener')
 
-# Import all subpackages
-for module in os.listdir(os.path.dirname(__file__)):
-    if module == '__init__.py' or module[-3:] != '.py':
-        continue
-    __import__('birdman.listen.'+module[:-3], locals(), globals())
-del module
+# registration decorator for listeners
+register_listener = _listeners.register
 
 
 # getter for listener class
 def get_listener(name):
-    """Return streamer class by its name.
+    """Return listener class by its name(KeyError if unknown).
+    """
+    return _listeners.get(name)
+
+
+def listener_names():
+    """Names of every listener class available.
     """
-    return _listeners[name]
\ No newline at end of file
+    return _listeners.names()
@@ -1,6 +1,9 @@
 from abc import ABCMeta, abstractmethod
 
 
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'sample')
+
+
 class BaseListener(object):
     """BaseListener class contains:
 
@@ -8,6 +11,9 @@ class BaseListener(object):
         listen : listens and reacts to the dictionary it is provided.
                  Since streamers provide dict with its own unique set of keys,
                  Listeners should be aware of such different formats.
+
+    Every listener runs as its own task behind a bounded queue(birdman.listen.runner),
+    so a slow listener does not stall the streamers nor the other listeners.
     """
 
     __metaclass__ = ABCMeta
@@ -15,14 +21,27 @@ class BaseListener(object):
     def __init__(self, obj):
         """
         Args:
-            listen_to: Iterable[str]. List of Streamer.config.name to listen.
+            name: str. Name of this listener(e.g. to remove it while running); class name for default.
+            listen_to: Iterable[str]. List of Streamer.config.name to listen,
+                       or glob patterns of them(e.g. `dcinside.minor.*`).
                        For default, listen on everything.
+            queue_size: int. Results waiting for this listener at most.
+            overflow: str. What to do with a result when the queue is full.
+                      'block': wait for the listener(slows every streamer down),
+                      'drop_oldest': drop the oldest result in the queue,
+                      'sample': once the queue is half full, keep only every `sample_every`-th result.
         """
+        self.name = obj.get('name', type(self).__name__)
         self.listen_to = obj.get('listen_to', None)
+        self.queue_size = int(obj.get('queue_size', 1000))
+        self.overflow = obj.get('overflow', 'block')
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError("`overflow` must be one of: %s" % ', '.join(OVERFLOW_POLICIES))
+        self.sample_every = max(1, int(obj.get('sample_every', 10)))
 
     @abstractmethod
     def listen(self, result):
-        '''Must override.
+        '''Must override; either a function or a coroutine function(`async def`).
         Listens to the result object(dict) and process it however you like.
         '''
         pass
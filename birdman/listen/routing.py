@@ -0,0 +1,57 @@
+"""Routing table from streamer names to the listeners listening to them."""
+import fnmatch
+import re
+
+
+class RoutingTable(object):
+    """RoutingTable maps a streamer name to its targets(listeners), computed once per name.
+
+    `listen_to` of a target is a list of streamer names or glob patterns(e.g. `dcinside.minor.*`);
+    None listens to every streamer.
+    Targets are kept in the order they are added, and the routes are updated in place when they change.
+
+    Methods:
+        add: add a target listening to `listen_to`.
+        remove: remove a target.
+        route: targets of a streamer name.
+        forget: drop the route of a streamer name that is gone.
+    """
+
+    def __init__(self):
+        self._targets = []  # (target, matcher)
+        self._routes = {}  # streamer name -> targets
+
+    @staticmethod
+    def _matcher(listen_to):
+        if listen_to is None:
+            return lambda name: True
+        if isinstance(listen_to, str):
+            listen_to = [listen_to]
+        names = set(pattern for pattern in listen_to if not any(c in pattern for c in '*?['))
+        patterns = [pattern for pattern in listen_to if pattern not in names]
+        if not patterns:
+            return names.__contains__
+        regex = re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+        return lambda name: name in names or regex.match(name) is not None
+
+    def add(self, target, listen_to):
+        matcher = self._matcher(listen_to)
+        self._targets.append((target, matcher))
+        for name, targets in self._routes.items():
+            if matcher(name):
+                targets.append(target)
+
+    def remove(self, target):
+        self._targets = [(other, matcher) for other, matcher in self._targets if other is not target]
+        for name, targets in self._routes.items():
+            if target in targets:
+                self._routes[name] = [other for other in targets if other is not target]
+
+    def route(self, name):
+        targets = self._routes.get(name)
+        if targets is None:
+            targets = self._routes[name] = [target for target, matcher in self._targets if matcher(name)]
+        return targets
+
+    def forget(self, name):
+        self._routes.pop(name, None)
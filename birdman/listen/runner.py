@@ -0,0 +1,104 @@
+"""Runs a listener as its own task behind a bounded queue."""
+import asyncio
+import inspect
+
+from birdman import metrics, trace
+
+
+class ListenerRunner(object):
+    """ListenerRunner feeds the results to a listener from a bounded queue,
+    applying the overflow policy of the listener(`overflow` of BaseListener) when the queue is full.
+
+    An exception raised by the listener is raised again by the next put(),
+    so that it stops Birdman as if the listener were called directly.
+
+    Methods:
+        put: enqueue a result(awaits only with the 'block' policy).
+        close: wait until the queue is empty(or timeout), and stop the task.
+    """
+
+    def __init__(self, listener, removed=()):
+        """
+        Args:
+            listener (BaseListener): listener to run.
+            removed (set): names of the streamers removed; their results still queued are dropped.
+        """
+        self.listener = listener
+        self.removed = removed
+        self.name = listener.name
+        self.listened = 0
+        self.dropped = 0
+        self._skipped = 0
+        self._queue = asyncio.Queue(maxsize=listener.queue_size)
+        self._task = asyncio.ensure_future(self._run())
+
+    @property
+    def task(self):
+        return self._task
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    @property
+    def stats(self):
+        return {'listened': self.listened, 'dropped': self.dropped, 'queued': self._queue.qsize()}
+
+    def _drop(self):
+        self.dropped += 1
+        metrics.inc('birdman_listener_dropped_total', listener=self.name)
+
+    async def put(self, result, track=None, name=None):
+        """
+        Args:
+            result (dict): result to listen to.
+            track: trace track of the result(birdman.trace.dispatched()).
+            name (str): name of the streamer of the result.
+        """
+        if self._task.done():
+            # Raise the exception of the listener
+            self._task.result()
+        item = (result, track, name)
+        policy = self.listener.overflow
+        if policy == 'block':
+            await self._queue.put(item)
+            return
+        if policy == 'sample' and self._queue.qsize() * 2 >= self._queue.maxsize:
+            self._skipped += 1
+            if self._skipped % self.listener.sample_every:
+                self._drop()
+                return
+        if self._queue.full():
+            self._drop()
+            if policy != 'drop_oldest':
+                return
+            self._queue.get_nowait()
+            self._queue.task_done()
+        self._queue.put_nowait(item)
+
+    async def _run(self):
+        while True:
+            result, track, name = await self._queue.get()
+            try:
+                if name in self.removed:
+                    continue
+                with metrics.Timer('birdman_listen_seconds', listener=self.name), trace.listen(track, self.listener):
+                    returned = self.listener.listen(result)
+                    if inspect.isawaitable(returned):
+                        await returned
+                self.listened += 1
+            finally:
+                self._queue.task_done()
+
+    async def close(self, timeout=10):
+        """Let the listener finish the queued results within `timeout` seconds, then stop the task.
+        """
+        if not self._task.done():
+            joined = asyncio.ensure_future(self._queue.join())
+            await asyncio.wait([joined, self._task], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            joined.cancel()
+            self._task.cancel()
+            await asyncio.wait([self._task])
+        # Raised by put() already, or stopped Birdman(e.g. KeyboardInterrupt)
+        if not self._task.cancelled():
+            self._task.exception()
@@ -0,0 +1,96 @@
+"""Non-blocking logging for streamers.
+
+Loggers of streamers only put records on a queue(QueueHandler);
+a background thread formats them and writes them to the real handlers(stderr, files),
+so that no write blocks the event loop.
+"""
+import atexit
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class _RoutingListener(QueueListener):
+    """QueueListener passing each record to the handlers of its logger only,
+    or of its nearest ancestor with handlers(records propagated from child loggers, e.g. birdman.lease).
+    """
+
+    def __init__(self, queue):
+        super(_RoutingListener, self).__init__(queue, respect_handler_level=True)
+        self.routes = {}  # logger name -> handlers
+
+    def handle(self, record):
+        record = self.prepare(record)
+        name = record.name
+        while name not in self.routes and '.' in name:
+            name = name.rsplit('.', 1)[0]
+        for handler in self.routes.get(name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_queue = queue.SimpleQueue()
+_listener = _RoutingListener(_queue)
+
+
+def _start():
+    if _listener._thread is None:
+        _listener.start()
+
+
+def stop():
+    """Write every queued record, and stop the writer thread(restarted by the next use_queue()).
+    """
+    if _listener._thread is not None:
+        _listener.stop()
+
+
+def use_queue(logger, handlers):
+    """Route the records of `logger` to `handlers` through the writer thread.
+    Replaces the handlers given for the same logger before.
+    """
+    old = _listener.routes.get(logger.name, [])
+    _listener.routes[logger.name] = list(handlers)
+    for handler in old:
+        handler.close()
+    if not any(isinstance(handler, QueueHandler) and handler.queue is _queue for handler in logger.handlers):
+        logger.addHandler(QueueHandler(_queue))
+    _start()
+
+
+_held = []
+
+
+def _before_fork():
+    # Fork only between writes, so that no lock of a handler(or its stream) is copied while held
+    _held[:] = [handler for handlers in _listener.routes.values() for handler in handlers]
+    for handler in _held:
+        handler.acquire()
+
+
+def _after_fork_in_parent():
+    for handler in _held:
+        handler.release()
+    _held[:] = []
+
+
+def _restart_in_child():
+    # Locks of the handlers are renewed by logging itself
+    _held[:] = []
+    # The writer thread does not survive fork(worker processes)
+    if _listener._thread is not None:
+        # Records queued before the fork are written by the parent
+        while True:
+            try:
+                _queue.get_nowait()
+            except queue.Empty:
+                break
+        _listener._thread = None
+        _start()
+
+
+atexit.register(stop)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(
+        before=_before_fork, after_in_parent=_after_fork_in_parent, after_in_child=_restart_in_child
+    )
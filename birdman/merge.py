@@ -0,0 +1,101 @@
+"""Merge of async iterables that can be added and removed while iterating."""
+import asyncio
+
+
+class _Failure(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class DynamicMerge(object):
+    """DynamicMerge yields the items of every source as they come, like aiostream.stream.merge,
+    but sources can be added and removed at any time without disturbing the others.
+
+    Each source is pumped by its own task into a bounded queue(backpressure to the sources).
+    An exception raised by a source is raised by the iteration.
+    The iteration ends when no source is left, unless `keep_alive`(sources may be added later).
+
+    Methods:
+        add: start merging a source under a key.
+        remove: stop a source, closing it.
+        __contains__: True if a source of the key is being merged.
+    """
+
+    def __init__(self, queue_size=64, keep_alive=False):
+        self.keep_alive = keep_alive
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = {}  # key -> pump task
+        self._idle = asyncio.Event()  # set when the last source is gone
+
+    def __contains__(self, key):
+        return key in self._tasks
+
+    def __len__(self):
+        return len(self._tasks)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def add(self, key, source):
+        if key in self._tasks:
+            raise ValueError("Source `%s` is already merged" % (key,))
+        self._idle.clear()
+        self._tasks[key] = asyncio.ensure_future(self._pump(key, source))
+
+    async def remove(self, key):
+        """Cancel the source of `key`(an item in flight is discarded), and wait until it is closed.
+        """
+        task = self._tasks.pop(key, None)
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.wait([task])
+        if not self._tasks:
+            self._idle.set()
+
+    async def _pump(self, key, source):
+        try:
+            async for item in source:
+                await self._queue.put(item)
+        except (Exception, GeneratorExit) as e:
+            await self._queue.put(_Failure(e))
+        finally:
+            if hasattr(source, 'aclose'):
+                await source.aclose()
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+                if not self._tasks:
+                    self._idle.set()
+
+    async def __aiter__(self):
+        if not self._tasks:
+            self._idle.set()
+        while True:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            elif self.keep_alive:
+                item = await self._queue.get()
+            elif self._idle.is_set():
+                return
+            else:
+                # Wait for an item, or for the last source to finish
+                get = asyncio.ensure_future(self._queue.get())
+                idle = asyncio.ensure_future(self._idle.wait())
+                try:
+                    await asyncio.wait([get, idle], return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    idle.cancel()
+                    if not get.done():
+                        # An item not taken yet stays in the queue
+                        get.cancel()
+                if not get.done() or get.cancelled():
+                    continue
+                item = get.result()
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    async def close(self):
+        for key in list(self._tasks):
+            await self.remove(key)
@@ -0,0 +1,170 @@
+"""Built-in instrumentation, exposed in the Prometheus text format.
+
+Metrics are recorded only after enable(); until then inc() and observe() return at once,
+so instrumented code costs a function call when metrics are disabled.
+Use `enabled()` to skip the work of computing a value(e.g. timing) as well.
+"""
+import bisect
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+
+# name -> (type, help)
+DESCRIPTIONS = {
+    'birdman_requests_total': ('counter', "HTTP responses by streamer and status code."),
+    'birdman_request_errors_total': ('counter', "HTTP requests failed by streamer and error type."),
+    'birdman_response_bytes_total': ('counter', "Bytes of HTTP response bodies by streamer."),
+    'birdman_retries_total': ('counter', "Retries of a failed request by streamer."),
+    'birdman_parse_seconds': ('histogram', "CPU seconds of parse calls by streamer."),
+    'birdman_comment_fetch_seconds': ('histogram', "Seconds to fetch the comments of a post by streamer."),
+    'birdman_items_total': ('counter', "Items yielded by streamer."),
+    'birdman_duplicates_total': ('counter', "Items dropped as duplicates by streamer."),
+    'birdman_listen_seconds': ('histogram', "Seconds of listen() by listener."),
+    'birdman_listener_dropped_total': ('counter', "Results dropped by the overflow policy of a listener queue."),
+    'birdman_queue_depth': ('gauge', "Items waiting in a queue."),
+    'birdman_recrawl_interval_seconds': ('gauge', "Seconds between crawling epochs by streamer(recrawl policy)."),
+    'birdman_recrawl_rate': ('gauge', "Estimated posts per second of a board by streamer(adaptive recrawl policy)."),
+    'birdman_streamer_crashes_total': ('counter', "Crashes of a streamer(or its crawling epochs)."),
+    'birdman_streamer_restarts_total': ('counter', "Restarts of a crashed streamer by the supervisor."),
+}
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = None
+
+
+class Registry(object):
+    """Counters and histograms keyed by (name, labels), and collectors of gauges evaluated when scraped.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self.collectors = []
+
+    def inc(self, name, value, labels):
+        self.counters[(name, labels)] += value
+
+    def observe(self, name, value, labels):
+        key = (name, labels)
+        if key not in self.histograms:
+            self.histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+        histogram = self.histograms[key]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            histogram[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def render(self):
+        """Return every metric in the Prometheus text format(version 0.0.4).
+        """
+        samples = defaultdict(list)  # name -> [(suffix, labels, value)]
+        for (name, labels), value in self.counters.items():
+            samples[name].append(('', labels, value))
+        for (name, labels), histogram in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                samples[name].append(('_bucket', labels + (('le', repr(bound)),), cumulative))
+            samples[name].append(('_bucket', labels + (('le', '+Inf'),), histogram[-1]))
+            samples[name].append(('_sum', labels, histogram[-2]))
+            samples[name].append(('_count', labels, histogram[-1]))
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                samples[name].append(('', tuple(sorted(labels.items())), value))
+
+        lines = []
+        for name in sorted(samples):
+            kind, description = DESCRIPTIONS.get(name, ('untyped', ''))
+            lines.append('# HELP %s %s' % (name, description))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for suffix, labels, value in samples[name]:
+                lines.append('%s%s%s %s' % (name, suffix, _format_labels(labels), _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for key, value in labels
+    )
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return repr(int(value))
+    return repr(value)
+
+
+def enable(buckets=BUCKETS):
+    """Start recording metrics(idempotent); returns the registry.
+    """
+    global _registry
+    if _registry is None:
+        _registry = Registry(buckets)
+    return _registry
+
+
+def enabled():
+    return _registry is not None
+
+
+def inc(name, value=1, **labels):
+    """Add `value` to a counter.
+    """
+    if _registry is not None:
+        _registry.inc(name, value, tuple(sorted(labels.items())))
+
+
+def observe(name, value, **labels):
+    """Record a sample of a histogram.
+    """
+    if _registry is not None:
+        _registry.observe(name, value, tuple(sorted(labels.items())))
+
+
+def add_collector(collector):
+    """Add a function returning [(name, labels(dict), value)], called on every scrape(e.g. queue depths).
+    """
+    if _registry is not None:
+        _registry.collectors.append(collector)
+
+
+class Timer(object):
+    """Context manager observing the elapsed seconds into a histogram; no clock reads when disabled.
+    """
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+        self._started = None
+
+    def __enter__(self):
+        if _registry is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started is not None:
+            observe(self.name, time.perf_counter() - self._started, **self.labels)
+
+
+async def serve(host='127.0.0.1', port=9108):
+    """Serve GET /metrics on a local HTTP endpoint. Returns the aiohttp AppRunner(cleanup() to stop).
+    """
+    async def handler(request):
+        body = _registry.render() if _registry is not None else ''
+        return web.Response(text=body, headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
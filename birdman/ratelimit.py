@@ -0,0 +1,90 @@
+"""Per-host token-bucket rate limiting shared by streamers."""
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket(object):
+    """Token bucket that refills `rate` tokens per second, holding at most `burst` tokens.
+
+    Tokens are reserved in advance(the bucket may go below zero),
+    so concurrent waiters are served in FIFO order without any lock.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): tokens(requests) per second.
+            burst (int): maximum number of tokens saved while idle.
+        """
+        if rate <= 0:
+            raise ValueError("`rate` of TokenBucket must be positive")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before it becomes valid.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        """Give back a reserved token that was not used.
+        """
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+
+
+class HostRateLimiter(object):
+    """Rate limiter keyed by the host of the requested URL.
+    A single instance is shared by every streamer of a Birdman, so the request rate
+    to a host does not grow with the number of streamers.
+    """
+
+    def __init__(self, obj=None):
+        """
+        Args:
+            obj (dict): result of YAML parsing(`rate_limit` in the `global` section).
+                        Maps host to {'rate': requests per second, 'burst': bucket size}.
+                        `default` is applied to hosts that are not listed.
+                        Hosts without any limit are not limited at all.
+        """
+        self._limits = {}
+        self._buckets = {}
+        for host, limit in (obj or {}).items():
+            self.configure(host, limit['rate'], limit.get('burst', 1))
+
+    def configure(self, host, rate, burst=1):
+        """Set(or replace) the limit of `host`. Use 'default' for unlisted hosts.
+        """
+        self._limits[host] = (rate, burst)
+        # Buckets are lazily rebuilt, since 'default' may affect any host
+        self._buckets.clear()
+
+    def bucket(self, host):
+        """Return the TokenBucket for `host`, or None if it is not limited.
+        """
+        if host not in self._buckets:
+            limit = self._limits.get(host, self._limits.get('default'))
+            self._buckets[host] = TokenBucket(*limit) if limit is not None else None
+        return self._buckets[host]
+
+    async def acquire(self, url):
+        """Wait until a request to `url` is allowed.
+        """
+        bucket = self.bucket(urlsplit(url).hostname)
+        if bucket is not None:
+            await bucket.acquire()
@@ -0,0 +1,196 @@
+"""Comment refresh of recently crawled posts."""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from birdman.ratelimit import TokenBucket
+
+
+def _fingerprint(comment):
+    text = '\t'.join(str(comment.get(key)) for key in ('user_id', 'nickname', 'written_at', 'body'))
+    return hashlib.sha1(text.encode('UTF-8')).hexdigest()[:16]
+
+
+class CommentRefresher(object):
+    """CommentRefresher re-fetches the comments of recently crawled posts
+    on a decaying schedule(first_delay, first_delay x backoff, ...)
+    and generates only the new comments as delta items.
+
+    Only the comment API of a post is requested(ActiveStreamer.get_comments), not the post itself.
+    Refreshes are limited to `rate` per second in total and `workers` at the same time,
+    so that they never starve crawling of new posts.
+
+    Methods:
+        add, remove: (un)register a streamer at runtime.
+        track: start refreshing a post yielded by a streamer.
+        stream: run the workers and generate (name, delta) of all refreshes.
+    """
+
+    def __init__(self, streamers=(), obj=None):
+        """
+        Args:
+            streamers (iterable): ActiveStreamer instances; posts are refreshed by their config.name.
+            obj (dict): result of YAML parsing(`refresh` in the `global` section).
+        """
+        obj = obj or {}
+        # Seconds until the first refresh, multiplied by `backoff` after each refresh
+        self.first_delay = obj.get('first_delay', 300)
+        self.backoff = obj.get('backoff', 2)
+        # Stop refreshing a post after this many refreshes, or this many seconds after its crawl
+        self.max_refreshes = obj.get('max_refreshes', 8)
+        self.max_age = obj.get('max_age', 86400)
+        # Maximum number of posts being refreshed; the oldest one is dropped first
+        self.capacity = obj.get('capacity', 10000)
+        # Budget of refreshes: per second(and bucket size), and at the same time
+        self._budget = TokenBucket(obj.get('rate', 0.5), obj.get('burst', 1))
+        self.workers = max(1, int(obj.get('workers', 2)))
+        # Maximum number of deltas waiting for the listeners
+        self.queue_size = obj.get('queue_size', 1000)
+
+        self._streamers = {
+            streamer.config.name: streamer for streamer in streamers if streamer.supports_comment_refresh
+        }
+        self._heap = []  # (due, seq, key)
+        self._seq = itertools.count()
+        # key -> tracked post(dict), in the order of tracking
+        self._tracked = OrderedDict()
+        self._wakeup = None
+        self._queue = None
+
+    def __len__(self):
+        return len(self._tracked)
+
+    @property
+    def queue_depth(self):
+        """Number of deltas waiting for the listeners.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def add(self, streamer):
+        if streamer.supports_comment_refresh:
+            self._streamers[streamer.config.name] = streamer
+
+    def remove(self, streamer):
+        """Stop refreshing the posts of `streamer`.
+        """
+        if self._streamers.get(streamer.config.name) is streamer:
+            del self._streamers[streamer.config.name]
+            for key in [key for key in self._tracked if key[0] == streamer.config.name]:
+                del self._tracked[key]
+
+    def track(self, name, post):
+        """Start refreshing `post` yielded by the streamer `name`, if the streamer supports it.
+        Posts crawled without comments(e.g. include_comments: 0) are ignored.
+        """
+        if name not in self._streamers or not isinstance(post, dict):
+            return
+        if post.get('post_no') is None or 'comments' not in post or 'refresh' in post:
+            return
+        key = (name, post['post_no'])
+        if key in self._tracked:
+            return
+
+        keys = self._streamers[name].comment_refresh_keys
+        seen = set()
+        for comment in post['comments']:
+            seen.add(_fingerprint(comment))
+            seen.update(_fingerprint(subcomment) for subcomment in comment['subcomments'])
+        self._tracked[key] = {
+            'post': {k: post[k] for k in keys if k in post},
+            'seen': seen,
+            'refreshes': 0,
+            'tracked_at': time.monotonic(),
+        }
+        if len(self._tracked) > self.capacity:
+            self._tracked.popitem(last=False)
+        self._push(key, self.first_delay)
+
+    def _push(self, key, delay):
+        entry = self._tracked[key]
+        entry['seq'] = next(self._seq)
+        heapq.heappush(self._heap, (time.monotonic() + delay, entry['seq'], key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _next_due(self):
+        """Wait for and pop the next post that is due.
+        """
+        while True:
+            while self._heap and self._tracked.get(self._heap[0][2], {}).get('seq') != self._heap[0][1]:
+                heapq.heappop(self._heap)  # dropped
+            now = time.monotonic()
+            if self._heap and self._heap[0][0] <= now:
+                return heapq.heappop(self._heap)[2]
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _delta(self, entry, comments):
+        """New comments(and new subcomments of old ones), in the same nested format.
+        """
+        delta = []
+        for comment in comments:
+            new_subcomments = [
+                subcomment for subcomment in comment['subcomments'] if _fingerprint(subcomment) not in entry['seen']
+            ]
+            if _fingerprint(comment) in entry['seen'] and not new_subcomments:
+                continue
+            delta.append({**comment, 'subcomments': new_subcomments})
+        for comment in delta:
+            entry['seen'].add(_fingerprint(comment))
+            entry['seen'].update(_fingerprint(subcomment) for subcomment in comment['subcomments'])
+        return delta
+
+    async def _worker(self):
+        while True:
+            key = await self._next_due()
+            entry = self._tracked[key]
+            streamer = self._streamers[key[0]]
+            await self._budget.acquire()
+            try:
+                comments = await streamer.get_comments(entry['post'])
+            except Exception as e:
+                streamer.logger.error("Comment refresh has failed: %s" % repr(e))
+                comments = None
+            entry['refreshes'] += 1
+
+            if comments:
+                delta = self._delta(entry, comments)
+                if delta:
+                    await self._queue.put((key[0], {
+                        **entry['post'],
+                        'refresh': entry['refreshes'],
+                        'refreshed_at': datetime.now().isoformat(),
+                        'comments': delta,
+                    }))
+
+            if self._tracked.get(key) is not entry:
+                continue  # dropped during the refresh
+            delay = self.first_delay * self.backoff ** entry['refreshes']
+            age = time.monotonic() - entry['tracked_at']
+            if entry['refreshes'] < self.max_refreshes and age + delay <= self.max_age:
+                self._push(key, delay)
+            else:
+                del self._tracked[key]
+
+    async def stream(self):
+        """Run the workers, and generate (name, delta) of the refreshed posts.
+        Delta has `url`, `post_no`, `refresh`(number of refreshes), `refreshed_at`, and `comments`(new only).
+        """
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        try:
+            while True:
+                yield await self._queue.get()
+        finally:
+            for worker in workers:
+                worker.cancel()
@@ -0,0 +1,75 @@
+"""Lazy registries of streamer and listener classes, accessed by config['class']."""
+import importlib
+
+try:
+    from importlib.metadata import entry_points
+except ImportError:  # Python < 3.8
+    entry_points = None
+
+
+class LazyRegistry(object):
+    """LazyRegistry maps a class name of the config(e.g. `dcinside`) to its class,
+    importing the module that defines it only when the name is first looked up,
+    so that a process does not pay for(nor require) the dependencies of the classes it never uses.
+
+    Names are found in this order:
+        1. classes registered already(by register(), e.g. a module imported by the user)
+        2. built-in modules(`modules`: name -> module path); the module registers the class on import
+        3. entry points of installed plugins in `group`, e.g. in the plugin's pyproject.toml:
+               [project.entry-points."birdman.streamers"]
+               mysite = "birdman_mysite:MySiteStreamer"
+           An entry point may refer to the class, or to a module that registers it.
+
+    Methods:
+        register: decorator registering a class under a name.
+        get: class of a name(KeyError if unknown).
+        names: every name that can be looked up.
+    """
+
+    def __init__(self, base, group, modules, decorator_name='register'):
+        """
+        Args:
+            base (type): every class must be a subclass of it.
+            group (str): entry point group of plugins.
+            modules (dict): name -> module path of the built-in classes.
+        """
+        self.base = base
+        self.group = group
+        self.modules = dict(modules)
+        self.decorator_name = decorator_name
+        self._classes = {}
+
+    def register(self, name):
+        def decorator(cls):
+            if not issubclass(cls, self.base):
+                raise ValueError("decorator `%s` must be used for %s subclass" % (self.decorator_name, self.base.__name__))
+            self._classes[name] = cls
+            return cls
+        return decorator
+
+    def _entry_points(self):
+        if entry_points is None:
+            return []
+        found = entry_points()
+        if hasattr(found, 'select'):
+            return list(found.select(group=self.group))
+        return list(found.get(self.group, []))  # Python < 3.10
+
+    def get(self, name):
+        if name in self._classes:
+            return self._classes[name]
+        if name in self.modules:
+            importlib.import_module(self.modules[name])
+        else:
+            for entry_point in self._entry_points():
+                if entry_point.name == name:
+                    loaded = entry_point.load()
+                    if isinstance(loaded, type):
+                        self.register(name)(loaded)
+                    break
+        if name not in self._classes:
+            raise KeyError(name)
+        return self._classes[name]
+
+    def names(self):
+        return sorted(set(self._classes) | set(self.modules) | set(ep.name for ep in self._entry_points()))
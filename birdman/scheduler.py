@@ -0,0 +1,166 @@
+"""Central crawl scheduler for a large number of ActiveStreamers."""
+import asyncio
+import heapq
+import itertools
+import time
+
+from birdman import trace
+
+
+class CrawlScheduler(object):
+    """CrawlScheduler runs crawling epochs of many ActiveStreamers(boards)
+    on a fixed pool of workers, instead of a long-lived coroutine per board.
+
+    A priority queue of (next_due, board) decides which board is crawled next.
+    At most `workers` epochs run at the same time(global in-flight cap),
+    and each board is rescheduled after its own next_recrawl_interval().
+    A board whose epoch has crashed is rescheduled after the backoff of the supervisor(birdman.supervisor).
+
+    Methods:
+        add: schedule a streamer.
+        remove: unschedule a streamer.
+        stream: run the workers and generate (name, result) of all epochs.
+    """
+
+    def __init__(self, streamers=(), obj=None, supervisor=None):
+        """
+        Args:
+            streamers (iterable): ActiveStreamer instances.
+            obj (dict): result of YAML parsing(`scheduler` in the `global` section).
+            supervisor (Supervisor): backoff & restart budget of crashed boards;
+                                     without it, a crashed board waits for its recrawl interval.
+        """
+        obj = obj or {}
+        self.supervisor = supervisor
+        # Maximum number of epochs in flight
+        self.workers = max(1, int(obj.get('workers', 16)))
+        # Initial epochs are spread evenly over this many seconds, so that they do not bunch up
+        self.spread = obj.get('spread', 60)
+        # Maximum number of results waiting for the listeners(backpressure to the workers)
+        self.queue_size = obj.get('queue_size', 1000)
+
+        self._heap = []  # (due, seq, streamer)
+        self._seq = itertools.count()
+        # id() of scheduled streamer -> seq of its valid heap entry(None while in an epoch).
+        # Entries of removed streamers are left in the heap and skipped.
+        self._scheduled = {}
+        self._epochs = {}  # id() of streamer -> task of its epoch in flight
+        self._removed = set()  # id() of streamers removed; their results still queued are dropped
+        self._wakeup = None
+        self._queue = None
+
+        streamers = list(streamers)
+        for i, streamer in enumerate(streamers):
+            self.add(streamer, delay=self.spread * i / len(streamers))
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    @property
+    def queue_depth(self):
+        """Number of results waiting for the listeners.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def add(self, streamer, delay=0):
+        """Schedule the first epoch of `streamer` after `delay` seconds.
+        """
+        if id(streamer) in self._scheduled:
+            return
+        self._removed.discard(id(streamer))
+        if streamer.config.verbose:
+            streamer.show_config()
+        self._push(streamer, time.monotonic() + delay)
+
+    async def remove(self, streamer):
+        """Unschedule `streamer`, and stop its epoch in flight(if any).
+        Results of the streamer not yet generated by stream() are dropped.
+        """
+        self._scheduled.pop(id(streamer), None)
+        self._removed.add(id(streamer))
+        epoch = self._epochs.get(id(streamer))
+        if epoch is not None:
+            epoch.cancel()
+            await asyncio.wait([epoch])
+
+    def _push(self, streamer, due):
+        seq = next(self._seq)
+        self._scheduled[id(streamer)] = seq
+        heapq.heappush(self._heap, (due, seq, streamer))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _next_due(self):
+        """Wait for and pop the next board that is due.
+        """
+        while True:
+            while self._heap and self._scheduled.get(id(self._heap[0][2])) != self._heap[0][1]:
+                heapq.heappop(self._heap)  # removed
+            now = time.monotonic()
+            if self._heap and self._heap[0][0] <= now:
+                streamer = heapq.heappop(self._heap)[2]
+                self._scheduled[id(streamer)] = None
+                return streamer
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _epoch(self, streamer):
+        """Crawl an epoch of `streamer`. Returns the seconds until the next one(None to drop the board).
+        """
+        try:
+            async for result in streamer.epoch():
+                # Epochs are run here instead of BaseStreamer.stream()
+                trace.yielded(streamer.config.name, result)
+                await self._queue.put((streamer, result))
+        except Exception as e:
+            if self.supervisor is None:
+                streamer.logger.error("Crawling epoch has crashed: %s" % repr(e))
+                return streamer.next_recrawl_interval()
+            return self.supervisor.crashed(streamer.config.name, e, streamer.logger)
+        interval = streamer.next_recrawl_interval()
+        streamer.log_recrawl_interval(interval)
+        return interval
+
+    async def _worker(self):
+        while True:
+            streamer = await self._next_due()
+            # A task of its own, so that remove() can stop the epoch without stopping the worker
+            epoch = asyncio.ensure_future(self._epoch(streamer))
+            self._epochs[id(streamer)] = epoch
+            try:
+                await asyncio.wait([epoch])
+            finally:
+                epoch.cancel()  # the worker is cancelled
+                self._epochs.pop(id(streamer), None)
+            # Not removed(nor re-added) during the epoch
+            if not epoch.cancelled() and id(streamer) in self._scheduled and self._scheduled[id(streamer)] is None:
+                delay = epoch.result()
+                if delay is None:
+                    # Given up by the supervisor
+                    del self._scheduled[id(streamer)]
+                else:
+                    self._push(streamer, time.monotonic() + delay)
+
+    async def stream(self):
+        """Run the workers, and generate (name, result) from the epochs of all boards.
+        """
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        try:
+            while True:
+                streamer, result = await self._queue.get()
+                if id(streamer) not in self._removed:
+                    yield streamer.config.name, result
+                else:
+                    trace.discard(streamer.config.name, result)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            for epoch in list(self._epochs.values()):
+                epoch.cancel()
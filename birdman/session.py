@@ -0,0 +1,45 @@
+"""Shared aiohttp connection pool for streamers."""
+import aiohttp
+
+
+class SessionFactory(object):
+    """Owner of a single aiohttp.ClientSession shared by streamers.
+
+    The session(and its connection pool) is created lazily inside the running loop
+    by the first get(), and re-created if it was closed.
+    """
+
+    def __init__(self, obj=None):
+        """
+        Args:
+            obj (dict): result of YAML parsing(`connection` in the `global` section).
+        """
+        obj = obj or {}
+        # Total and per-host number of simultaneous connections
+        self.limit = obj.get('limit', 100)
+        self.limit_per_host = obj.get('limit_per_host', 8)
+        # Seconds to keep idle connections alive for reuse
+        self.keepalive_timeout = obj.get('keepalive_timeout', 30)
+        # Seconds to cache DNS lookups
+        self.ttl_dns_cache = obj.get('ttl_dns_cache', 300)
+
+        self._session = None
+
+    async def get(self):
+        """Return the shared session. Must be called inside the running loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.ttl_dns_cache
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
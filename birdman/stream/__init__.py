@@ -3,29 +3,28 @@
 from __future__ import absolute_import
 
 from birdman.stream.base import BirdmanStreamerError, BaseStreamer
-import os
+from birdman.registry import LazyRegistry
 
-# registration decorator for streamers (accessed by config['class'])
-_streamers = {}
-def register_streamer(name):
-    def decorator(cls):
-        if not issubclass(cls, BaseStreamer):
-            raise ValueError("decorator `register_streamer` must be used for BaseStreamer subclass")
-        _streamers[name] = cls
-        return cls
-    return decorator
+# Streamer classes (accessed by config['class']).
+# Modules are imported on first use only; plugins register through the `birdman.streamers` entry points.
+_streamers = LazyRegistry(BaseStreamer, 'birdman.streamers', {
+    'dcinside': 'birdman.stream.dcinside',
+    'todayhumor': 'birdman.stream.todayhumor',
+    'twitterkeyword': 'birdman.stream.twitter',
+}, decorator_name='register_streamer')
 
-
-# Import all subpackages
-for module in os.listdir(os.path.dirname(__file__)):
-    if module == '__init__.py' or module[-3:] != '.py':
-        continue
-    __import__('birdman.stream.'+module[:-3], locals(), globals())
-del module
+# registration decorator for streamers
+register_streamer = _streamers.register
 
 
 # getter for streamer class
 def get_streamer(name):
-    """Return streamer class by its name.
+    """Return streamer class by its name(KeyError if unknown).
+    """
+    return _streamers.get(name)
+
+
+def streamer_names():
+    """Names of every streamer class available.
     """
-    return _streamers[name]
\ No newline at end of file
+    return _streamers.names()
@@ -1,11 +1,38 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import hashlib
+import itertools
+import logging
+import random
+import time
+
 import aiohttp
 
 from birdman.stream.base import BaseStreamer, BaseStreamerConfig
+from birdman.ratelimit import HostRateLimiter
+from birdman.session import SessionFactory
+from birdman.stream.recrawl import get_recrawl_policy
+from birdman.error import CacheMissError
+from birdman import metrics, trace
 
 from abc import ABCMeta, abstractmethod
 
+
+def _timed(func, *args):
+    """Call `func` and return (result, CPU time of the call). Module-level, to run in the parse executor.
+    """
+    start = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - start
+
+
+def _retryable(error):
+    # Client errors(4xx) are answered the same way again, except rate limiting
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return True
+
+
 class ActiveStreamerConfig(BaseStreamerConfig):
     """Config object for Active Streamer.
     """
@@ -17,28 +44,120 @@ class ActiveStreamerConfig(BaseStreamerConfig):
         """
         super(ActiveStreamerConfig, self).__init__(obj)
 
-        self.markup = 'html.parser'
+        # Markup parser backend: 'html5lib', 'lxml' or 'html.parser'(see birdman.stream.parsers)
+        self.markup = obj.get('markup', 'html.parser')
+        # Imported here, so that bs4 is loaded only by processes running active streamers
+        from birdman.stream.parsers import get_backend
+        get_backend(self.markup)
 
         self.recrawl_interval = obj.get('recrawl_interval', 1800)
+        # 'fixed': always wait recrawl_interval
+        # 'adaptive': wait until about `posts_per_page` new posts are expected(EWMA of arrival rate),
+        #             starting from recrawl_interval and bounded by [recrawl_min, recrawl_max]
+        self.recrawl_policy = obj.get('recrawl_policy', 'fixed')
+        self.recrawl_min = obj.get('recrawl_min', 60)
+        self.recrawl_max = obj.get('recrawl_max', 3600)
+        self.recrawl_alpha = obj.get('recrawl_alpha', 0.3)
+        self.posts_per_page = obj.get('posts_per_page', 50)
 
         self.timeout = obj.get('timeout', 5)
         self.page_interval = obj.get('page_interval', 0.5)
+        # Retries of a failed request(see ActiveStreamer.request); the epoch fails after the last one
+        self.max_retries = int(obj.get('max_retries', 5))
+        self.retry_backoff = float(obj.get('retry_backoff', 1))
+        self.retry_backoff_max = float(obj.get('retry_backoff_max', 30))
+
+        # Number of posts(including their comments) requested at the same time.
+        self.fetch_concurrency = max(1, int(obj.get('fetch_concurrency', 1)))
+        # Order of the yielded posts: 'list'(same as the post list) or 'completion'(first fetched first)
+        self.fetch_order = obj.get('fetch_order', 'list')
+        if self.fetch_order not in ('list', 'completion'):
+            raise ValueError("`fetch_order` must be either 'list' or 'completion'")
+
+        # Also checkpoint the progress of an epoch every N posts(0: only at the end of epochs)
+        self.checkpoint_every = int(obj.get('checkpoint_every', 0))
+
+        # If given, Birdman also crawls the history of the board in parallel; see birdman.backfill
+        self.backfill = obj.get('backfill', None)
+
+        # Send conditional requests for the first post list page, and skip the epoch if unchanged
+        self.conditional_get = bool(obj.get('conditional_get', 1))
 
         # Custom header is required in order to request.
         self.header = {'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:59.0) Gecko/20100101 Firefox/59.0'}
 
+
+class PageValidators(object):
+    """Per-URL validators(ETag, Last-Modified, and hash of the body) for conditional requests.
+
+    New validators are staged until commit(), so that a page is only skipped
+    if the epoch that processed its previous version has finished.
+    """
+
+    def __init__(self):
+        self._validators = {}  # url -> (etag, last_modified, digest, size)
+        self._staged = {}
+        # Hit/miss counts of conditional requests
+        self.stats = {
+            'not_modified': 0,  # 304 Not Modified
+            'same_hash': 0,  # 200 OK, but the body is unchanged
+            'modified': 0,
+            'bytes_saved': 0,  # body not transferred(304)
+        }
+
+    def headers(self, url):
+        """Return the conditional request headers for `url`.
+        """
+        etag, last_modified, _, _ = self._validators.get(url, (None, None, None, 0))
+        headers = {}
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def not_modified(self, url):
+        """Record a 304 response.
+        """
+        self.stats['not_modified'] += 1
+        self.stats['bytes_saved'] += self._validators[url][3]
+
+    def check(self, url, headers, text):
+        """Record a 200 response and return True if the body has changed since the last commit.
+        """
+        digest = hashlib.sha1(text.encode('UTF-8')).digest()
+        if url in self._validators and self._validators[url][2] == digest:
+            self.stats['same_hash'] += 1
+            return False
+        self.stats['modified'] += 1
+        self._staged[url] = (headers.get('ETag'), headers.get('Last-Modified'), digest, len(text))
+        return True
+
+    def commit(self):
+        self._validators.update(self._staged)
+        self._staged.clear()
+
+    def discard(self):
+        self._staged.clear()
+
+
 class ActiveStreamer(BaseStreamer):
     """ActiveStreamer 
     ActiveStreamer routinely requests data within given interval.
 
     Methods:
-        job: template for active parsing.
+        job: template for active parsing; repeats epoch() every next_recrawl_interval().
+        epoch: a single crawling epoch.
         - REQUIRES:
             get_post: crawl the post and generates result object(usually a dict).
             summary: generates and logs summary text for each result generated
+        request: GET request under the per-host rate limit(optionally conditional).
+        parse: run a parse function, in the parse executor if any.
+        fetch_posts: fetch posts concurrently(bounded by config.fetch_concurrency).
+        is_crawled: check if the post is already crawled in the previous epochs.
         close:
-            closes the streamer's aiohttp session.
+            closes the streamer's aiohttp session(unless shared by Birdman).
     
     - inherited from BaseStreamer
         get_parser: returns initial argument parser
@@ -49,34 +168,387 @@ class ActiveStreamer(BaseStreamer):
 
     __metaclass__ = ABCMeta
 
+    # job() crawls epochs forever
+    endless = True
+
+    # config key of a board id(e.g. 'gallery_id'), if the streamer crawls a board
+    board_key = None
+
+    # keys of a post kept to refresh its comments; get_comments() receives only these(see birdman.refresh)
+    comment_refresh_keys = ('url', 'post_no')
+
     def __init__(self):
-        self._session = aiohttp.ClientSession()
+        # Private session and unlimited requests,
+        # unless Birdman shares its own via set_session_factory() / set_rate_limiter()
+        self._session_factory = SessionFactory()
+        self._owns_session_factory = True
+        self._rate_limiter = HostRateLimiter()
+        # Parse in the event loop, unless Birdman shares its process pool via set_parse_executor()
+        self._parse_executor = None
+        # Number of parse calls and their CPU time(seconds, wherever they ran)
+        self.parse_stats = {'calls': 0, 'cpu_time': 0.0}
+        # Validators for conditional requests; see `conditional_stats` for hit/miss counts
+        self._validators = PageValidators()
+        # Created from self.config on first use
+        self._recrawl_policy = None
+        # Record/replay of the responses, if Birdman shares its cache via set_http_cache()
+        self._http_cache = None
+        # Durable crawl cursor, if Birdman shares its store via set_checkpoint_store()
+        self._checkpoint_store = None
+        # Post range already yielded by the last interrupted epoch: dict(low, high, datetime)
+        self._resume = None
+        # post_no of the last post list entry, until which every post is yielded in the current epoch
+        self._watermark = None
+
+    @property
+    def conditional_stats(self):
+        """Hit/miss counts of the conditional requests(dict).
+        """
+        return self._validators.stats
+
+    def set_session_factory(self, session_factory):
+        super(ActiveStreamer, self).set_session_factory(session_factory)
+        self._owns_session_factory = False
+
+    def set_rate_limiter(self, rate_limiter):
+        """Share a HostRateLimiter(usually owned by Birdman) with this streamer.
+        """
+        self._rate_limiter = rate_limiter
+
+    def set_http_cache(self, cache):
+        """Share a HTTPCache(usually owned by Birdman). page_interval is ignored while replaying.
+        """
+        self._http_cache = cache
+        if cache.replay:
+            self.config.page_interval = 0
+
+    def set_checkpoint_store(self, store):
+        """Share a CheckpointStore(usually owned by Birdman), and resume from the checkpoint.
+        """
+        self._checkpoint_store = store
+        checkpoint = store.load(self.config.name)
+        if checkpoint is not None:
+            self.config.set_current(
+                max(self.config.current_post_id, checkpoint['post_id']),
+                max(self.config.current_datetime, checkpoint['datetime'])
+            )
+            self._resume = checkpoint['progress']
+
+    def _save_checkpoint(self, progress=None):
+        if self._checkpoint_store is not None:
+            self._checkpoint_store.save(
+                self.config.name, self.config.current_post_id, self.config.current_datetime, progress
+            )
+
+    def _progress(self, newest_post_id, newest_datetime):
+        """Posts yielded so far by the current epoch(and the last interrupted one) as a post_no range.
+        """
+        if self._watermark is None or newest_post_id <= self.config.current_post_id:
+            return self._resume
+        if self._resume is not None and self._watermark > self._resume['high']:
+            # Not contiguous with the range of the last interrupted epoch yet
+            return self._resume
+        progress = {'low': self._watermark, 'high': newest_post_id, 'datetime': newest_datetime}
+        if self._resume is not None:
+            progress = {
+                'low': min(progress['low'], self._resume['low']),
+                'high': max(progress['high'], self._resume['high']),
+                'datetime': max(progress['datetime'], self._resume['datetime']),
+            }
+        return progress
+
+    @property
+    def recrawl_policy(self):
+        """Recrawl policy of this streamer(config.recrawl_policy).
+        """
+        if self._recrawl_policy is None:
+            self._recrawl_policy = get_recrawl_policy(self.config)
+        return self._recrawl_policy
+
+    def next_recrawl_interval(self):
+        """Seconds to wait before the next crawling epoch.
+        """
+        return self.recrawl_policy.interval()
+
+    def log_recrawl_interval(self, interval):
+        """Report the wait before the next crawling epoch(and the post arrival rate of an adaptive policy).
+        """
+        rate = getattr(self.recrawl_policy, 'rate', None)
+        if rate is None:
+            self.logger.info("Next crawling epoch in %.1f seconds" % interval)
+        else:
+            self.logger.info("Next crawling epoch in %.1f seconds(%.4f posts/s)" % (interval, rate))
 
     async def job(self):
+        """Crawl epochs forever, waiting next_recrawl_interval() between them.
+        """
+        while True:
+            async for result in self.epoch():
+                yield result
+            interval = self.next_recrawl_interval()
+            self.log_recrawl_interval(interval)
+            await asyncio.sleep(interval)
+
+    async def epoch(self):
+        """A single crawling epoch; crawl posts from the newest one until config.current_*.
+        Updates config.current_*, the checkpoint and the recrawl policy at the end.
+        If the epoch is interrupted, config.current_* is kept
+        and the next epoch skips the posts already yielded.
+        """
         self.logger.info("Start of crawling epoch")
 
         new_post_id, new_datetime = self.config.current_post_id, self.config.current_datetime
-        initial_result = True
+        written_ats = []
+        self._watermark = None
+        completed = False
         try:
             async for result in self.get_post():
-                if initial_result:
-                    new_post_id, new_datetime = result['post_no'], result['written_at']
-                    initial_result = False
                 if result is not None:
-                    self.summary(result)
+                    # Posts may arrive out of list order(config.fetch_order); keep the newest.
+                    new_post_id = max(new_post_id, result['post_no'])
+                    new_datetime = max(new_datetime, result['written_at'])
+                    written_ats.append(result['written_at'])
+                    # Summaries are long(the whole post & comments); build them only to be logged
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.summary(result)
                 yield result
-        except Exception as e:
-            print(e)
+                every = self.config.checkpoint_every
+                if every and result is not None and len(written_ats) % every == 0:
+                    self._save_checkpoint(self._progress(new_post_id, new_datetime))
+            completed = True
+        except Exception:
+            # Raised to the supervisor, which restarts this streamer after a backoff
             self.logger.info("Terminate due to an error.")
+            raise
         finally:
+            # Pages of an interrupted epoch must be processed again, even if unchanged
+            if completed:
+                self._validators.commit()
+            else:
+                self._validators.discard()
             if self.config.verbose:
                 self.logger.info("End of crawling epoch(reached config.current_*)")
-            self.config.set_current(new_post_id, new_datetime)
-            await asyncio.sleep(self.config.recrawl_interval)
-            self.job()
+                self.logger.info("Conditional requests: %s" % self.conditional_stats)
+            if completed:
+                if self._resume is not None:
+                    new_post_id = max(new_post_id, self._resume['high'])
+                    new_datetime = max(new_datetime, self._resume['datetime'])
+                    self._resume = None
+                self.config.set_current(new_post_id, new_datetime)
+            else:
+                self._resume = self._progress(new_post_id, new_datetime)
+            self._save_checkpoint(self._resume)
+            self.recrawl_policy.update(written_ats)
+
+    def set_parse_executor(self, executor):
+        """Share a concurrent.futures.Executor(usually Birdman's process pool) for parsing.
+        """
+        self._parse_executor = executor
 
     async def close(self):
-        await self._session.close()
+        if self._owns_session_factory:
+            await self._session_factory.close()
+
+    async def request(self, url, conditional=False):
+        """GET request under the per-host rate limit.
+        Timeouts, connection errors and retryable responses(429, 5xx) are retried up to `max_retries` times,
+        waiting `retry_backoff` seconds(doubled on every retry, up to `retry_backoff_max`) in between.
+
+        Args:
+            url (str): URL to request
+            conditional (bool): send ETag/Last-Modified validators of the previous response,
+                                and compare the body hash if the site sends neither.
+
+        Returns:
+            text (str): response body. None if conditional and the page has not changed.
+
+        Raises:
+            CacheMissError: replaying the HTTP cache, and `url` was not recorded.
+            aiohttp.ClientResponseError: non-2xx response(other than 304 of a conditional request).
+            aiohttp.ClientConnectionError, asyncio.TimeoutError: still failing after the retries.
+        """
+        delay = self.config.retry_backoff
+        for attempt in itertools.count():
+            try:
+                return await self._request(url, conditional)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                if attempt >= self.config.max_retries or not _retryable(e):
+                    raise
+                wait = delay * random.uniform(0.5, 1.5)
+                self.logger.warning("Retry(%d/%d) in %.1f seconds: %s %s" % (
+                    attempt + 1, self.config.max_retries, wait, url,
+                    e.status if isinstance(e, aiohttp.ClientResponseError) else repr(e)
+                ))
+            metrics.inc('birdman_retries_total', streamer=self.config.name)
+            await asyncio.sleep(wait)
+            delay = min(self.config.retry_backoff_max, delay * 2)
+
+    async def _request(self, url, conditional):
+        headers = self.config.header
+        if conditional:
+            headers = {**headers, **self._validators.headers(url)}
+
+        if self._http_cache is not None and self._http_cache.replay:
+            recorded = self._http_cache.get(url)
+            if recorded is None:
+                raise CacheMissError(self.config.name, url)
+            status, response_headers, text = recorded
+        else:
+            session = await self._session_factory.get()
+            await self._rate_limiter.acquire(url)
+            try:
+                with trace.span('request', url=url):
+                    async with session.get(
+                        url,
+                        headers=headers,
+                        timeout=self.config.timeout
+                    ) as response:
+                        status = response.status
+                        if conditional and status == 304:
+                            metrics.inc('birdman_requests_total', streamer=self.config.name, status=status)
+                            self._validators.not_modified(url)
+                            return None
+                        if status >= 400:
+                            metrics.inc('birdman_requests_total', streamer=self.config.name, status=status)
+                            response.raise_for_status()
+                        text = await response.text()
+                        response_headers = response.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.inc('birdman_request_errors_total', streamer=self.config.name, type=type(e).__name__)
+                raise
+            if self._http_cache is not None:
+                self._http_cache.put(url, status, response_headers, text)
+        if metrics.enabled():
+            metrics.inc('birdman_requests_total', streamer=self.config.name, status=status)
+            metrics.inc('birdman_response_bytes_total', len(text.encode('UTF-8')), streamer=self.config.name)
+        if conditional and not self._validators.check(url, response_headers, text):
+            return None
+        return text
+
+    async def parse(self, func, *args):
+        """Run a parse function and return its result.
+        With the parse executor, `func` runs in another process and the event loop is not blocked,
+        so it must be a picklable(module-level) and stateless function.
+
+        Args:
+            func (callable): parse function, e.g. parse_post(markup, parser, name)
+            *args: arguments of `func`
+
+        Returns:
+            result of `func`
+        """
+        with trace.span('parse', func=func.__name__):
+            if self._parse_executor is None:
+                result, cpu_time = _timed(func, *args)
+            else:
+                result, cpu_time = await asyncio.get_running_loop().run_in_executor(
+                    self._parse_executor, _timed, func, *args
+                )
+        self.parse_stats['calls'] += 1
+        self.parse_stats['cpu_time'] += cpu_time
+        metrics.observe('birdman_parse_seconds', cpu_time, streamer=self.config.name)
+        return result
+
+    def is_resumed(self, entry):
+        """Check if the post is yielded by the last interrupted epoch(i.e. in its progress).
+        """
+        return self._resume is not None and self._resume['low'] <= entry['post_no'] <= self._resume['high']
+
+    def is_crawled(self, post):
+        """Check if we have saw this post before(i.e. reached config.current_*).
+
+        Args:
+            post (dict): post, or entry of the post list. Requires `post_no`;
+                         `written_at` is compared only if it is given(not None).
+        """
+        if post['post_no'] <= self.config.current_post_id:
+            return True
+        # FIXME: Directly comparing datetime ISO-formatted string
+        return post.get('written_at') is not None and post['written_at'] <= self.config.current_datetime
+
+    async def fetch_posts(self, entries, fetch_post):
+        """Fetch posts with at most config.fetch_concurrency requests in flight.
+        Stops at the first post(in list order) that is already crawled;
+        the cursor is checked on the post list first, so old posts are never requested.
+
+        Args:
+            entries (async iterable): entries of the post list, newest first(i.e. get_post_list()).
+                                      dict with `url`, `post_no` and `written_at`(None if unknown).
+            fetch_post (coroutine function): crawls a single URL and returns the post(dict).
+
+        Yields:
+            post (dict): posts in list order or completion order(config.fetch_order)
+        """
+        ordered = self.config.fetch_order == 'list'
+        entry_iter = entries.__aiter__()
+        pending = {}  # task -> index in the post list
+        finished = {}  # index -> post(None if not to yield), until every previous index is finished
+        post_nos = {}  # index -> post_no, until finished
+        next_index = 0  # first unfinished index in the list order
+        scheduled = 0
+        stop_at = None  # index of the first crawled post
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and stop_at is None and len(pending) < self.config.fetch_concurrency:
+                    try:
+                        entry = await entry_iter.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    if self.is_crawled(entry):
+                        # Everything below this entry is old; the post list is not requested anymore
+                        stop_at = scheduled
+                        break
+                    post_nos[scheduled] = entry['post_no']
+                    if self.is_resumed(entry):
+                        # Yielded by an interrupted epoch before
+                        finished[scheduled] = None
+                    else:
+                        trace.add_span('list', entry['post_no'], self.config.name, entry.get('list_span'))
+                        pending[asyncio.ensure_future(
+                            trace.fetch(self.config.name, entry['post_no'], fetch_post, entry['url'])
+                        )] = scheduled
+                    scheduled += 1
+
+                if pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in sorted(done, key=pending.get):
+                        if task not in pending:
+                            continue  # cancelled after an earlier post reached the cursor
+                        index = pending.pop(task)
+                        post = task.result()
+                        if not isinstance(post, dict) or self.is_crawled(post):
+                            post = None
+                            if stop_at is None or index < stop_at:
+                                stop_at = index
+                                # Every post after the stop point is already crawled; do not wait for them.
+                                for other, other_index in list(pending.items()):
+                                    if other_index > stop_at:
+                                        other.cancel()
+                                        del pending[other]
+                        elif not ordered and (stop_at is None or index < stop_at):
+                            yield post
+                            post = None
+                        finished[index] = post
+
+                # Every post until the watermark is yielded(or skipped)
+                while next_index in finished and (stop_at is None or next_index < stop_at):
+                    post = finished.pop(next_index)
+                    post_no = post_nos.pop(next_index)
+                    next_index += 1
+                    if post is not None:
+                        yield post
+                    self._watermark = post_no
+
+                if not pending and (exhausted or stop_at is not None):
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if hasattr(entry_iter, 'aclose'):
+                await entry_iter.aclose()
 
     @abstractmethod
     async def get_post(self):
@@ -88,10 +560,24 @@ class ActiveStreamer(BaseStreamer):
         '''
         pass
 
+    @property
+    def supports_comment_refresh(self):
+        """True if get_comments() is overridden(see birdman.refresh).
+        """
+        return type(self).get_comments is not ActiveStreamer.get_comments
+
+    async def get_comments(self, post):
+        '''Override to support comment refresh.
+        Return all comments of the `post`(the comment_refresh_keys of what get_post() yields),
+        in the same format as post['comments']; request the comment API only, not the post itself.
+        '''
+        raise NotImplementedError()
+
     @abstractmethod
     async def summary(self, result):
         '''Override as a void function(i.e. no return value).
         
         Use self.logger to generate logs with the result(what get_post() yields).
+        Called only if DEBUG logs of self.logger are enabled.
         '''
         pass
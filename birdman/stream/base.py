@@ -3,9 +3,10 @@ from __future__ import print_function
 from __future__ import absolute_import
 from __future__ import division
 
-import urllib3
 import logging
 
+from birdman import log, trace
+
 from abc import ABCMeta, abstractmethod
 
 
@@ -37,14 +38,23 @@ class BaseStreamer(object):
         get_parser: returns initial argument parser
         show_options: show options that can be used or parsed
         set_logger: set logger configurations
+        set_session_factory: share a SessionFactory(usually owned by Birdman)
         stream: try asynchronous streaming using job method
     """
 
     __metaclass__ = ABCMeta
 
+    # True if job() never ends by itself; its end is then a crash, and the supervisor restarts it
+    endless = False
+
     def __init__(self, config_obj):
         self.config = BaseStreamerConfig(config_obj)
 
+    def set_session_factory(self, session_factory):
+        """Share a SessionFactory(usually owned by Birdman) with this streamer.
+        """
+        self._session_factory = session_factory
+
     def show_config(self):
         """Print out config available and predefined values."""
 
@@ -65,31 +75,25 @@ class BaseStreamer(object):
         formatter = logging.Formatter('[%(levelname)s] ' + self.config.name 
 + ' %(asctime)s | %(message)s\n')
 
-        # Handler
-        handler = logging.StreamHandler(stream)
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        # Handler; records are written by a background thread(birdman.log), not in the event loop
+        handlers = [logging.StreamHandler(stream)]
         if filename is not None:
             if isinstance(filename, str):
                 filename = [filename]
             for file in filename:
-                handler = logging.FileHandler(file, mode='a', encoding='UTF-8')
-                handler.setFormatter(formatter)
-                self.logger.addHandler(handler)
+                handlers.append(logging.FileHandler(file, mode='a', encoding='UTF-8'))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        log.use_queue(self.logger, handlers)
 
     async def stream(self):
         if self.config.verbose:
             self.show_config()
 
-        try:
-            async for result in self.job():
-                yield self.config.name, result
-        except urllib3.exceptions.ProtocolError:
-            self.logger.warning("ProtocolError has raised but continue to stream.")
-            self.stream()
-        except RecursionError:
-            self.logger.error("RecursionError; too much retries")
-            return
+        # A crash ends the stream; Birdman restarts it(birdman.supervisor)
+        async for result in self.job():
+            trace.yielded(self.config.name, result)
+            yield self.config.name, result
 
     @abstractmethod
     async def job(self):
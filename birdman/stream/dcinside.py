@@ -4,7 +4,7 @@ from aiostream import stream
 import aiohttp
 
 # Parsing
-from bs4 import BeautifulSoup
+from birdman.stream.parsers import get_backend
 
 # Formatting
 import re
@@ -15,7 +15,8 @@ from colorama import Fore
 
 from birdman.stream import register_streamer
 from birdman.stream.active import ActiveStreamer, ActiveStreamerConfig
-from birdman.error import ParserUpdateRequiredError, UnknownError
+from birdman import metrics, trace
+from birdman.error import ParserUpdateRequiredError, UnknownError, CacheMissError
 
 
 class DCInsideStreamerConfig(ActiveStreamerConfig):
@@ -29,8 +30,9 @@ class DCInsideStreamerConfig(ActiveStreamerConfig):
         """
         super(DCInsideStreamerConfig, self).__init__(obj)
 
-        # Markup parser: override ActiveStreamerConfig
-        self.markup = 'html5lib'
+        # Markup parser: override default of ActiveStreamerConfig
+        self.markup = obj.get('markup', 'html5lib')
+        get_backend(self.markup)
 
         # DCInside Gallery ID (str)
         self.gallery_id = obj.get('gallery_id', 'animal')
@@ -60,6 +62,11 @@ class DCInsideStreamer(ActiveStreamer):
     Special credits to "KotlinInside" & JellyBrick@github for finding perfect API endpoints
     """
 
+    # config key of a board; `boards` in YAML expands to a streamer per board
+    board_key = 'gallery_id'
+    # the comment API takes the gallery of a post
+    comment_refresh_keys = ('url', 'post_no', 'gallery_id')
+
     def __init__(self, config_obj):
         super(DCInsideStreamer, self).__init__()
 
@@ -105,198 +112,253 @@ class DCInsideStreamer(ActiveStreamer):
 
         gallery_id = self.config.gallery_id
         try:
-            async for url in self.get_post_list(gallery_id):
-                while True:
-                    try:
-                        # Site's anti-bot policy may block crawling & you can consider gentle crawling
-                        await asyncio.sleep(self.config.page_interval)
-
-                        async with self._session.get(
-                            url,
-                            headers=self.config.header,
-                            timeout=self.config.timeout
-                        ) as response:
-
-                            post = self.parse_post(await response.text(), self.config.markup)
-                            break
-                    except (aiohttp.ServerTimeoutError, asyncio.TimeoutError):
-                        # if timeout occurs, retry
-                        continue
-                    except aiohttp.InvalidURL:
-                        raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
-
-                if not isinstance(post, dict):
-                    return
+            async for post in self.fetch_posts(self.get_post_list(gallery_id), self.fetch_post):
+                yield post
+        except ParserUpdateRequiredError:
+            raise
+        except Exception as e:
+            # Not BaseException; cancellation and generator exit must pass through
+            raise UnknownError(self.config.name) from e
+
+    async def fetch_post(self, url, skip_crawled=True):
+        """Crawl a single post(and its comments) of DCInside.
+
+        Args:
+            url (str): URL of the post
+            skip_crawled (bool): do not request comments of the posts already crawled
+
+        Returns:
+            post (dict): Dict object containing relevant information about the post
+        """
+        gallery_id = self.config.gallery_id
+        try:
+            # Site's anti-bot policy may block crawling & you can consider gentle crawling
+            await asyncio.sleep(self.config.page_interval)
+
+            # Timeouts are retried by request(); an error still raised fails the epoch
+            post = await self.parse(parse_post, await self.request(url), self.config.markup, self.config.name)
+        except aiohttp.InvalidURL:
+            raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
+        except CacheMissError:
+            # The recording ends before this post(replaying the HTTP cache); so does the epoch
+            return None
+
+        if not isinstance(post, dict):
+            return None
+
+        post['url'] = url
+        post['gallery_id'] = gallery_id
+        post_no = int(re.search('no=([0-9]*)', url).group(1))
+        post['post_no'] = post_no
+        post['crawled_at'] = datetime.now().isoformat()
 
-                post['url'] = url
-                post['gallery_id'] = gallery_id
-                post_no = int(re.search('no=([0-9]*)', url).group(1))
-                post['post_no'] = post_no
-                post['crawled_at'] = datetime.now().isoformat()
+        # Do not request comments for the post we have saw before
+        if skip_crawled and self.is_crawled(post):
+            return post
 
-                if self.config.include_comments and 'comment_cnt' in post:
-                    if post['comment_cnt'] > 0:
+        if self.config.include_comments and 'comment_cnt' in post:
+            if post['comment_cnt'] > 0:
+                with metrics.Timer('birdman_comment_fetch_seconds', streamer=self.config.name), trace.span('comments'):
+                    try:
                         post['comments'] = await self.get_all_comments(gallery_id, post_no)
-                    else:
-                        post['comments'] = []
+                    except CacheMissError:
+                        return None
+            else:
+                post['comments'] = []
 
-                # Check if we have saw this post before
-                if post_no <= self.config.current_post_id or post['written_at'] <= self.config.current_datetime:
-                    # FIXME: Directly comparing datetime ISO-formatted string
-                    return
+        return post
 
-                yield post
-        except GeneratorExit:
-            raise GeneratorExit()
-        except ParserUpdateRequiredError as e:
-            raise e
-        except:
-            raise UnknownError(self.config.name)
-
-    async def get_post_list(self, gallery_id):
+    async def get_post_list(self, gallery_id, first_page=1, last_page=None, conditional=True):
         """DCinside Post generator
 
         Args:
             gallery_id (str): Gallery ID
+            first_page, last_page (int): range of the pages(None: until the end of the list)
+            conditional (bool): skip the rest if the first page has not changed(config.conditional_get)
 
         Yields:
-            url (str): URL for the next post found
+            entry (dict): `url`, `post_no` and `written_at` of the next post found
         """
-        page = 1
-        while True:
+        page = first_page
+        while last_page is None or page <= last_page:
             try:
                 url = '%s?id=%s&page=%d' % (self._lists_url, gallery_id, page)
                 await asyncio.sleep(self.config.page_interval)
-                async with self._session.get(
-                    url,
-                    headers=self.config.header,
-                    timeout=self.config.timeout
-                ) as response:
-                    post_list = self.parse_post_list(await response.text(), self.config.markup)
-                    for url in post_list:
-                        yield self._view_url + re.sub('&page=[0-9]*', '', url)
+                with trace.span('list', page=page) as list_span:
+                    # Unchanged first page means no new posts; skip parsing & the rest of the epoch
+                    text = await self.request(
+                        url, conditional=(conditional and page == 1 and self.config.conditional_get)
+                    )
+                    if text is None:
+                        self.logger.info("Post list has not changed")
+                        return
+                    post_list = await self.parse(parse_post_list, text, self.config.markup, self.config.name)
+                if not post_list:
+                    # Past the last page
+                    return
+                for entry in post_list:
+                    entry['url'] = self._view_url + re.sub('&page=[0-9]*', '', entry['url'])
+                    # Time of the list page, for the trace of the post(birdman.trace)
+                    entry['list_span'] = list_span
+                    yield entry
                 page += 1
-            except (aiohttp.ServerTimeoutError, asyncio.TimeoutError):
-                # if timeout occurs, retry
-                continue
+            except CacheMissError:
+                # End of the recorded post list(replaying the HTTP cache)
+                return
             except aiohttp.InvalidURL:
                 raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
         
+    async def get_comments(self, post):
+        """Refresh the comments of a post(birdman.refresh).
+        """
+        with metrics.Timer('birdman_comment_fetch_seconds', streamer=self.config.name):
+            try:
+                return await self.get_all_comments(post['gallery_id'], post['post_no'])
+            except CacheMissError:
+                # Not recorded(replaying the HTTP cache); nothing to refresh
+                return None
+
     async def get_all_comments(self, gallery_id, post_no):
         """Get all comments by DCInside mobile app API.
         """
-        comments = []
         try:
-            async with self._session.get(
-                                '%s?id=%s&no=%s' % (self._comment_api_url, gallery_id, post_no),
-                                headers=self.config.header,
-                                timeout=self.config.timeout
-                            ) as response:
-
-                response = json.loads(await response.text())
-                for comment in response[0]['comment_list']:
-                    comment_data = {
-                            'user_id': comment['user_id'],
-                            'user_ip': comment['ipData'],
-                            'nickname': comment['name'],
-
-                            'written_at': datetime.strptime(comment['date_time'], "%Y.%m.%d %H:%M").isoformat(),
-
-                            'body': re.sub('(<br>)+', '\n', comment['comment_memo']),
-
-                            'subcomments': []
-                    }
-                    if 'under_step' not in comment:
-                        comments.append(comment_data)
-                    else:
-                        comments[-1]['subcomments'].append(comment_data)
-                return comments
+            text = await self.request('%s?id=%s&no=%s' % (self._comment_api_url, gallery_id, post_no))
         except aiohttp.InvalidURL:
             raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
-        except (aiohttp.ServerTimeoutError, asyncio.TimeoutError):
-            return await self.get_all_comments(gallery_id, post_no)
-        except RecursionError:
-            return []
 
-    def parse_post_list(self, markup, parser):
-        """BeatifulSoup based post list parser
+        return parse_comments(text, self.config.name)
 
-        Args:
-            markup (str): response.text
-            parser (str): parser option for bs4.
 
-        Returns:
-            post_list (list): List object containing URL(after domain only) of posts within the page 
-        """
+def parse_post_list(markup, parser, name):
+    """BeatifulSoup based post list parser; builds `div.gall_listwrap` only
 
-        try:
-            soup = BeautifulSoup(markup, parser).find('div', attrs={'class': 'gall_listwrap'})
-            if '해당 갤러리는 존재하지 않습니다' in str(soup):
-                raise ParserUpdateRequiredError(self.config.name, "Gallery `%s` does not exists in DCInside." % self.config.board_id)
+    Module-level & stateless, so that it can run in the parse executor(other process).
 
-            raw_post_list = soup.find_all('tr', attrs={'class': 'us-post'})
-            # remove NOTICE posts(fixed at the top of the list)
-            post_list = [
-                tr.find('a')['href'] for tr in raw_post_list
-            ]
-            return post_list
-        except (AttributeError, KeyError) as er:
-            raise ParserUpdateRequiredError(self.config.name, "Post list webpage HTML structure may has been changed.")
+    Args:
+        markup (str): response.text
+        parser (str): markup parser backend(birdman.stream.parsers).
+        name (str): name of the streamer, for error messages.
 
-        raise UnknownError(self.config.name)
+    Returns:
+        post_list (list): List of dicts for the posts within the page;
+                          `url`(after domain only), `post_no` and `written_at`(None if not shown)
+    """
 
-    def parse_post(self, markup, parser):
-        """BeatifulSoup based post parser
+    try:
+        soup = get_backend(parser).subtree(markup, 'div', {'class': 'gall_listwrap'})
+        if '해당 갤러리는 존재하지 않습니다' in str(soup):
+            raise ParserUpdateRequiredError(name, "Gallery does not exists in DCInside.")
+
+        raw_post_list = soup.find_all('tr', attrs={'class': 'us-post'})
+        # remove NOTICE posts(fixed at the top of the list)
+        post_list = []
+        for tr in raw_post_list:
+            url = tr.find('a')['href']
+            # full timestamp is in the tooltip of the date column
+            timestamp = tr.find('td', attrs={'class': 'gall_date'}).get('title')
+            if timestamp:
+                timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").isoformat()
+            post_list.append({
+                'url': url,
+                'post_no': int(re.search('no=([0-9]+)', url).group(1)),
+                'written_at': timestamp or None,
+            })
+        return post_list
+    except (AttributeError, KeyError, ValueError) as er:
+        raise ParserUpdateRequiredError(name, "Post list webpage HTML structure may has been changed.")
+
+    raise UnknownError(name)
+
+
+def parse_post(markup, parser, name):
+    """BeatifulSoup based post parser; builds `div.view_content_wrap` only
+
+    Module-level & stateless, so that it can run in the parse executor(other process).
+
+    Args:
+        markup (str): response.text
+        parser (str): markup parser backend(birdman.stream.parsers).
+        name (str): name of the streamer, for error messages.
+
+    Returns:
+        post (dict): Dict object containing relevant information about the post
+    """
+    try:
+        soup = get_backend(parser).subtree(markup, 'div', {'class': 'view_content_wrap'})
+        if '해당 갤러리는 존재하지 않습니다' in str(soup):
+            raise ParserUpdateRequiredError(name, "Gallery does not exists in DCInside.")
 
-        Args:
-            markup (str): response.text
-            parser (str): parser option for bs4.
+        timestamp = soup.find('span', attrs={'class': 'gall_date'}).getText()
+        timestamp = datetime.strptime(timestamp, "%Y.%m.%d %H:%M:%S").isoformat()
 
-        Returns:
-            post (dict): Dict object containing relevant information about the post
-        """
-        try:
-            soup = BeautifulSoup(markup, parser).find('div', attrs={'class': 'view_content_wrap'})
-            if '해당 갤러리는 존재하지 않습니다' in str(soup):
-                raise ParserUpdateRequiredError(self.config.name, "Gallery `%s` does not exists in DCInside." % self.config.board_id)
+        user_info = soup.find('div', attrs={'class': 'gall_writer'})
+        user_id = user_info['data-uid']
+        user_ip = user_info['data-ip']
+        nickname = user_info['data-nick']
 
-            timestamp = soup.find('span', attrs={'class': 'gall_date'}).getText()
-            timestamp = datetime.strptime(timestamp, "%Y.%m.%d %H:%M:%S").isoformat()
+        view_cnt = int(soup.find('span', attrs={'class': 'gall_count'}).getText().replace(u'조회 ', ''))
+        view_up = int(soup.find('p', attrs={'class', 'up_num'}).getText())
+        view_dn = int(soup.find('p', attrs={'class', 'down_num'}).getText())
+        comment_cnt = int(soup.find('span', attrs={'class': 'gall_comment'}).getText().replace(u'댓글 ', ''))
 
-            user_info = soup.find('div', attrs={'class': 'gall_writer'})
-            user_id = user_info['data-uid']
-            user_ip = user_info['data-ip']
-            nickname = user_info['data-nick']
+        title = soup.find('span', attrs={'class': 'title_subject'}).getText()
 
-            view_cnt = int(soup.find('span', attrs={'class': 'gall_count'}).getText().replace(u'조회 ', ''))
-            view_up = int(soup.find('p', attrs={'class', 'up_num'}).getText())
-            view_dn = int(soup.find('p', attrs={'class', 'down_num'}).getText())
-            comment_cnt = int(soup.find('span', attrs={'class': 'gall_comment'}).getText().replace(u'댓글 ', ''))
+        body = soup.find('div', attrs={'class': 'write_div'}).get_text('\n', strip=True)
 
-            title = soup.find('span', attrs={'class': 'title_subject'}).getText()
+        post = {
+            'user_id': user_id,
+            'user_ip': user_ip,
+            'nickname': nickname,
 
-            body = soup.find('div', attrs={'class': 'write_div'}).get_text('\n', strip=True)
+            'title': title,
+            'written_at': timestamp,
 
-            post = {
-                'user_id': user_id,
-                'user_ip': user_ip,
-                'nickname': nickname,
+            'view_up': view_up,
+            'view_dn': view_dn,
+            'view_cnt': view_cnt,
+            'comment_cnt': comment_cnt,
+            'body': body,
+        }
 
-                'title': title,
-                'written_at': timestamp,
+        return post
+    except (AttributeError, KeyError) as er:
+        raise ParserUpdateRequiredError(name, "Post webpage HTML structure may has been changed.")
 
-                'view_up': view_up,
-                'view_dn': view_dn,
-                'view_cnt': view_cnt,
-                'comment_cnt': comment_cnt,
-                'body': body,
-            }
+    raise UnknownError(name)
 
-            return post
-        except (AttributeError, KeyError) as er:
-            raise ParserUpdateRequiredError(self.config.name, "Post webpage HTML structure may has been changed.")
 
-        raise UnknownError(self.config.name)
+def parse_comments(text, name):
+    """Parser of the comment API(JSON) response; the comments with their subcomments
+
+    Args:
+        text (str): response.text
+        name (str): name of the streamer, for error messages.
+
+    Returns:
+        comments (list): List of dicts for the comments, each with `subcomments`
+    """
+    try:
+        comments = []
+        response = json.loads(text)
+        for comment in response[0]['comment_list']:
+            comment_data = {
+                    'user_id': comment['user_id'],
+                    'user_ip': comment['ipData'],
+                    'nickname': comment['name'],
+
+                    'written_at': datetime.strptime(comment['date_time'], "%Y.%m.%d %H:%M").isoformat(),
+
+                    'body': re.sub('(<br>)+', '\n', comment['comment_memo']),
+
+                    'subcomments': []
+            }
+            if 'under_step' not in comment:
+                comments.append(comment_data)
+            else:
+                comments[-1]['subcomments'].append(comment_data)
+        return comments
+    except (IndexError, KeyError, TypeError, ValueError) as er:
+        raise ParserUpdateRequiredError(name, "Comment API response structure may has been changed.")
 
 
 async def main():
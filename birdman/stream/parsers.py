@@ -0,0 +1,90 @@
+"""Markup parser backends for ActiveStreamer parse functions.
+
+Every backend returns the same BeautifulSoup subtree for the same page,
+so parse functions work unchanged and yield identical results on any backend.
+Select one by `markup` in the streamer config.
+"""
+import re
+from abc import ABCMeta, abstractmethod
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+# registration decorator for parser backends (accessed by config['markup'])
+_backends = {}
+def register_backend(name):
+    def decorator(cls):
+        if not issubclass(cls, ParserBackend):
+            raise ValueError("decorator `register_backend` must be used for ParserBackend subclass")
+        _backends[name] = cls()
+        return cls
+    return decorator
+
+
+class ParserBackend(object):
+    """ParserBackend builds the part of the document that a parse function needs.
+
+    Methods:
+        subtree: parse the markup and return the first tag matching name & attrs.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def subtree(self, markup, name, attrs):
+        '''Must override.
+        Return the first tag(bs4.element.Tag) matching `name` and `attrs`, or None.
+        '''
+        pass
+
+
+@register_backend('html5lib')
+class Html5libBackend(ParserBackend):
+    """Slowest, but parses like web browsers do(maximum fidelity).
+    html5lib cannot parse partially, so the whole document is built.
+    """
+
+    def subtree(self, markup, name, attrs):
+        return BeautifulSoup(markup, 'html5lib').find(name, attrs=attrs)
+
+
+class StrainerBackend(ParserBackend):
+    """Builds only the matching subtree(SoupStrainer) with the `features` tree builder of bs4.
+    """
+
+    features = None
+
+    def subtree(self, markup, name, attrs):
+        # While parsing, the strainer sees the raw `class` string(e.g. "gall_listwrap list"),
+        # not the list of classes; match a class name as a whole word instead.
+        strainer_attrs = {
+            key: re.compile(r'(^|\s)%s(\s|$)' % re.escape(value)) if key == 'class' else value
+            for key, value in attrs.items()
+        }
+        strainer = SoupStrainer(name, attrs=strainer_attrs)
+        return BeautifulSoup(markup, self.features, parse_only=strainer).find(name, attrs=attrs)
+
+
+@register_backend('lxml')
+class LxmlBackend(StrainerBackend):
+    """Fastest; requires lxml.
+    """
+
+    features = 'lxml'
+
+
+@register_backend('html.parser')
+class HTMLParserBackend(StrainerBackend):
+    """Python standard library parser; no extra dependency.
+    """
+
+    features = 'html.parser'
+
+
+# getter for parser backend
+def get_backend(name):
+    """Return parser backend instance by its name.
+    """
+    if name not in _backends:
+        raise ValueError("Unknown markup parser `%s`; available: %s" % (name, ', '.join(sorted(_backends))))
+    return _backends[name]
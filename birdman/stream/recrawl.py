@@ -0,0 +1,85 @@
+"""Recrawl policies: how long an ActiveStreamer waits between crawling epochs."""
+from datetime import datetime
+
+
+class FixedRecrawlPolicy(object):
+    """Always wait config.recrawl_interval seconds.
+
+    Methods:
+        update: observe `written_at` of the posts crawled in an epoch.
+        interval: seconds to wait before the next epoch.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def update(self, written_ats):
+        pass
+
+    def interval(self):
+        return self.config.recrawl_interval
+
+
+class AdaptiveRecrawlPolicy(FixedRecrawlPolicy):
+    """Estimate the post arrival rate of the board(EWMA of posts per second),
+    and wait until about a single post list page of new posts has accumulated.
+    The interval is bounded by config.recrawl_min and config.recrawl_max.
+    """
+
+    # Minimum time window(seconds) of a single rate sample, against bursts within a second
+    min_window = 60
+
+    def __init__(self, config):
+        super(AdaptiveRecrawlPolicy, self).__init__(config)
+        self.rate = None  # posts per second; None until the first observation
+        self._newest = None  # newest `written_at` observed so far
+
+    def update(self, written_ats):
+        timestamps = []
+        for written_at in written_ats:
+            try:
+                timestamps.append(datetime.fromisoformat(written_at))
+            except (TypeError, ValueError):
+                continue
+        timestamps.sort()
+
+        if timestamps:
+            # Posts arrived during (previous newest post, newest post]
+            since = self._newest if self._newest is not None else timestamps[0]
+            window = max((timestamps[-1] - since).total_seconds(), self.min_window)
+            sample = len(timestamps) / window
+            self._newest = max(timestamps[-1], self._newest or timestamps[-1])
+        elif self.rate is not None:
+            # Nothing new during the last interval
+            sample = 0.0
+        else:
+            return
+
+        if self.rate is None:
+            self.rate = sample
+        else:
+            alpha = self.config.recrawl_alpha
+            self.rate = alpha * sample + (1 - alpha) * self.rate
+
+    def interval(self):
+        if self.rate is None:
+            interval = self.config.recrawl_interval
+        elif self.rate <= 0:
+            interval = self.config.recrawl_max
+        else:
+            interval = self.config.posts_per_page / self.rate
+        return min(max(interval, self.config.recrawl_min), self.config.recrawl_max)
+
+
+_policies = {
+    'fixed': FixedRecrawlPolicy,
+    'adaptive': AdaptiveRecrawlPolicy,
+}
+
+
+def get_recrawl_policy(config):
+    """Return a new recrawl policy for the config(config.recrawl_policy).
+    """
+    if config.recrawl_policy not in _policies:
+        raise ValueError("`recrawl_policy` must be one of: %s" % ', '.join(sorted(_policies)))
+    return _policies[config.recrawl_policy](config)
@@ -4,18 +4,18 @@ from aiostream import stream
 import aiohttp
 
 # Parsing
-from bs4 import BeautifulSoup
+from birdman.stream.parsers import get_backend
 
 # Formatting
 import re
-import json
 from datetime import datetime
 import colorama
 from colorama import Style, Fore
 
 from birdman.stream import register_streamer
 from birdman.stream.active import ActiveStreamer, ActiveStreamerConfig
-from birdman.error import ParserUpdateRequiredError, UnknownError
+from birdman import trace
+from birdman.error import ParserUpdateRequiredError, UnknownError, CacheMissError
 
 class TodayHumorStreamerConfig(ActiveStreamerConfig):
     """Config object for TodayHumorStreamer.
@@ -28,8 +28,7 @@ class TodayHumorStreamerConfig(ActiveStreamerConfig):
         """
         super(TodayHumorStreamerConfig, self).__init__(obj)
 
-        # Markup parser: override ActiveStreamerConfig
-        # self.markup = 'html5lib'
+        # Markup parser: use default of ActiveStreamerConfig
 
         # TodayHumor Board ID (str)
         self.board_id = obj.get('board_id', 'animal')
@@ -56,12 +55,14 @@ class TodayHumorStreamer(ActiveStreamer):
     TodayHumorStreamer helps to stream specific board from future to past.
     """
 
+    # config key of a board; `boards` in YAML expands to a streamer per board
+    board_key = 'board_id'
+
     def __init__(self, config_obj):
+        super(TodayHumorStreamer, self).__init__()
 
         self.config = TodayHumorStreamerConfig(config_obj)
 
-        self._session = aiohttp.ClientSession()
-
         self.set_logger()
         # Use colorama
         colorama.init()
@@ -102,207 +103,204 @@ class TodayHumorStreamer(ActiveStreamer):
 
         board_id = self.config.board_id
         try:
-            async for url in self.get_post_list(board_id):
-                while True:
-                    try:
-                        # Site's anti-bot policy may block crawling & you can consider gentle crawling
-                        await asyncio.sleep(self.config.page_interval)
-
-                        async with self._session.get(
-                            url,
-                            headers=self.config.header,
-                            timeout=self.config.timeout
-                        ) as response:
-                            post = self.parse_post(await response.text(), self.config.markup)
-                            break
-                    except (aiohttp.ServerTimeoutError, asyncio.TimeoutError):
-                        # if timeout occurs, retry
-                        continue
-                    except aiohttp.InvalidURL:
-                        raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
-
-                if not isinstance(post, dict):
-                    return
+            async for post in self.fetch_posts(self.get_post_list(board_id), self.fetch_post):
+                yield post
+        except ParserUpdateRequiredError:
+            raise
+        except Exception as e:
+            # Not BaseException; cancellation and generator exit must pass through
+            raise UnknownError(self.config.name) from e
 
-                post['url'] = url
-                post['board_id'] = board_id
-                post_no = int(re.search('no=([0-9]*)', url).group(1))
-                post['post_no'] = post_no
-                post['crawled_at'] = datetime.now().isoformat()
-
-                if self.config.include_comments and 'comment_cnt' in post:
-                    # if post['comment_cnt'] > 0:
-                    #     post['comments'] = await self.get_all_comments(board_id, post_no)
-                    # else:
-                        post['comments'] = []
-
-                # Check if we have saw this post before
-                if post_no <= self.config.current_post_id or post['written_at'] <= self.config.current_datetime:
-                    # FIXME: Directly comparing datetime ISO-formatted string
-                    return
+    async def fetch_post(self, url, skip_crawled=True):
+        """Crawl a single post of TodayHumor.
 
-                yield post
-        except GeneratorExit:
-            raise GeneratorExit()
-        except ParserUpdateRequiredError as e:
-            raise e
-        except:
-            raise UnknownError(self.config.name)
-
-    async def get_post_list(self, board_id):
+        Args:
+            url (str): URL of the post
+            skip_crawled (bool): do not request comments of the posts already crawled(unused)
+
+        Returns:
+            post (dict): Dict object containing relevant information about the post
+        """
+        board_id = self.config.board_id
+        try:
+            # Site's anti-bot policy may block crawling & you can consider gentle crawling
+            await asyncio.sleep(self.config.page_interval)
+
+            # Timeouts are retried by request(); an error still raised fails the epoch
+            post = await self.parse(parse_post, await self.request(url), self.config.markup, self.config.name)
+        except aiohttp.InvalidURL:
+            raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
+        except CacheMissError:
+            # The recording ends before this post(replaying the HTTP cache); so does the epoch
+            return None
+
+        if not isinstance(post, dict):
+            return None
+
+        post['url'] = url
+        post['board_id'] = board_id
+        post_no = int(re.search('no=([0-9]*)', url).group(1))
+        post['post_no'] = post_no
+        post['crawled_at'] = datetime.now().isoformat()
+
+        if self.config.include_comments and 'comment_cnt' in post:
+            # if post['comment_cnt'] > 0:
+            #     post['comments'] = await self.get_all_comments(board_id, post_no)
+            # else:
+                post['comments'] = []
+
+        return post
+
+    async def get_post_list(self, board_id, first_page=1, last_page=None, conditional=True):
         """TodayHumor Post generator
 
         Args:
             board_id (str): Board ID
+            first_page, last_page (int): range of the pages(None: until the end of the list)
+            conditional (bool): skip the rest if the first page has not changed(config.conditional_get)
 
         Yields:
-            url (str): URL for the next post found
+            entry (dict): `url`, `post_no` and `written_at` of the next post found
         """
-        page = 1
-        while True:
+        page = first_page
+        while last_page is None or page <= last_page:
             try:
                 url = '%s?table=%s&page=%d' % (self._lists_url, board_id, page)
                 await asyncio.sleep(self.config.page_interval)
-                async with self._session.get(
-                    url,
-                    headers=self.config.header,
-                    timeout=self.config.timeout
-                ) as response:
-                    post_list = self.parse_post_list(await response.text(), self.config.markup)
-                    for url in post_list:
-                        yield self._view_url + re.sub('&s_no=[0-9]+&page=[0-9]*', '', url)
+                with trace.span('list', page=page) as list_span:
+                    # Unchanged first page means no new posts; skip parsing & the rest of the epoch
+                    text = await self.request(
+                        url, conditional=(conditional and page == 1 and self.config.conditional_get)
+                    )
+                    if text is None:
+                        self.logger.info("Post list has not changed")
+                        return
+                    post_list = await self.parse(parse_post_list, text, self.config.markup, self.config.name)
+                if not post_list:
+                    # Past the last page
+                    return
+                for entry in post_list:
+                    entry['url'] = self._view_url + re.sub('&s_no=[0-9]+&page=[0-9]*', '', entry['url'])
+                    # Time of the list page, for the trace of the post(birdman.trace)
+                    entry['list_span'] = list_span
+                    yield entry
                 page += 1
-            except aiohttp.ServerTimeoutError:
-                # if timeout occurs, retry
-                continue
+            except CacheMissError:
+                # End of the recorded post list(replaying the HTTP cache)
+                return
             except aiohttp.InvalidURL:
                 raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
         
-    async def get_all_comments(self, board_id, post_no):
-        """Get all comments by TodayHumor mobile app API.
-        """
-        comments = []
-        try:
-            async with self._session.get(
-                                '%s?id=%s&no=%s' % (self._comment_api_url, board_id, post_no),
-                                headers=self.config.header,
-                                timeout=self.config.timeout
-                            ) as response:
-
-                response = json.loads(await response.text())
-                for comment in response[0]['comment_list']:
-                    comment_data = {
-                            'user_id': comment['user_id'],
-                            'user_ip': comment['ipData'],
-                            'nickname': comment['name'],
-
-                            'written_at': datetime.strptime(comment['date_time'], "%Y.%m.%d %H:%M").isoformat(),
-
-                            'body': re.sub('(<br>)+', '\n', comment['comment_memo']),
-
-                            'subcomments': []
-                    }
-                    if 'under_step' not in comment:
-                        comments.append(comment_data)
-                    else:
-                        comments[-1]['subcomments'].append(comment_data)
-                return comments
-        except aiohttp.ServerTimeoutError:
-            # if timeout occurs, retry
-            return self. get_all_comments(board_id, post_no)
-        except aiohttp.InvalidURL:
-            raise ParserUpdateRequiredError(self.config.name, "Invalid URL. Website or API address may has changed.")
-
-    def parse_post_list(self, markup, parser):
-        """BeatifulSoup based post list parser
 
-        Args:
-            markup (str): response.text
-            parser (str): parser option for bs4.
+def parse_post_list(markup, parser, name):
+    """BeatifulSoup based post list parser; builds `table.table_list` only
 
-        Returns:
-            post_list (list): List object containing URL(after domain only) of posts within the page 
-        """
+    Module-level & stateless, so that it can run in the parse executor(other process).
 
-        try:
-            soup = BeautifulSoup(markup, parser).find('table', attrs={'class': 'table_list'})
-            if '존재하지 않는 게시판입니다.' in str(soup):
-                raise ParserUpdateRequiredError(self.config.name, "Board `%s` does not exists in TodayHumor." % self.config.board_id)
-            raw_post_list = soup.find_all('td', attrs={'class': 'subject'})
+    Args:
+        markup (str): response.text
+        parser (str): markup parser backend(birdman.stream.parsers).
+        name (str): name of the streamer, for error messages.
 
-            # remove NOTICE posts(fixed at the top of the list)
-            post_list = [
-                tr.find('a')['href'] for tr in raw_post_list
-            ]
-            return post_list
-        except (AttributeError, KeyError) as er:
-            raise ParserUpdateRequiredError(self.config.name, "Website HTML structure may has been changed.")
+    Returns:
+        post_list (list): List of dicts for the posts within the page;
+                          `url`(after domain only), `post_no` and `written_at`(None if not shown)
+    """
 
-        raise UnknownError(self.config.name)
+    try:
+        soup = get_backend(parser).subtree(markup, 'table', {'class': 'table_list'})
+        if '존재하지 않는 게시판입니다.' in str(soup):
+            raise ParserUpdateRequiredError(name, "Board does not exists in TodayHumor.")
+        raw_post_list = soup.find_all('td', attrs={'class': 'subject'})
+
+        # remove NOTICE posts(fixed at the top of the list)
+        post_list = []
+        for td in raw_post_list:
+            url = td.find('a')['href']
+            timestamp = td.parent.find('td', attrs={'class': 'date'})
+            if timestamp is not None:
+                # The list shows minutes only("22/01/11 12:40"); take the last second of the minute
+                # so that a post is never considered as crawled too early.
+                timestamp = datetime.strptime(timestamp.getText().strip(), "%y/%m/%d %H:%M")
+                timestamp = timestamp.replace(second=59).isoformat()
+            post_list.append({
+                'url': url,
+                'post_no': int(re.search('no=([0-9]+)', url).group(1)),
+                'written_at': timestamp,
+            })
+        return post_list
+    except (AttributeError, KeyError, ValueError) as er:
+        raise ParserUpdateRequiredError(name, "Website HTML structure may has been changed.")
 
-    def parse_post(self, markup, parser):
-        """BeatifulSoup based post parser
+    raise UnknownError(name)
 
-        Args:
-            markup (str): response.text
-            parser (str): parser option for bs4.
 
-        Returns:
-            post (dict): Dict object containing relevant information about the post
-        """
-        try:
-            soup = BeautifulSoup(markup, parser).find('div', attrs={'class': 'containerInner'})
-            if '존재하지 않는 게시판입니다.' in str(soup):
-                raise ParserUpdateRequiredError(self.config.name, "Board `%s` does not exists in TodayHumor." % self.config.board_id)
-
-            post_info = soup.find('div', attrs={'class': 'writerInfoContents'})
-
-            user_id = post_info.find('span', attrs={'id': 'viewPageWriterNameSpan'})['mn']
-            nickname = post_info.find('span', attrs={'id': 'viewPageWriterNameSpan'})['name']
-
-            view_updn = post_info.find('span', attrs={'class', 'view_ok_nok'}).getText()
-            if '/' not in view_updn:
-                view_up = int(view_updn)
-                view_dn = 0
-            else:
-                view_up = int(view_updn.split('/')[0])
-                view_dn = int(view_updn.split('/')[0])
-
-            for div in post_info.find_all('div'):
-                if u'등록시간' in div.get_text():
-                    timestamp = div.getText().strip().replace(u'등록시간 : ', '')
-                    timestamp = datetime.strptime(timestamp, "%Y/%m/%d %H:%M:%S").isoformat()
-                elif u'조회수' in div.get_text():
-                    view_cnt = int(div.getText().replace(u'조회수 : ', ''))
-                elif u'댓글' in div.get_text():
-                    comment_cnt = int(div.getText().replace(u'댓글 : ', '').replace(u'개', ''))
-                elif 'IP' in div.get_text():
-                    user_ip = div.getText().replace('IP : ', '')
-
-            title = soup.find('div', attrs={'class': 'viewSubjectDiv'}).getText().strip()
-
-            body = soup.find('div', attrs={'class': 'viewContent'}).get_text('\n', strip=True)
-
-            post = {
-                'user_id': user_id,
-                'user_ip': user_ip,
-                'nickname': nickname,
-
-                'title': title,
-                'written_at': timestamp,
+def parse_post(markup, parser, name):
+    """BeatifulSoup based post parser; builds `div.containerInner` only
 
-                'view_up': view_up,
-                'view_dn': view_dn,
-                'view_cnt': view_cnt,
-                'comment_cnt': comment_cnt,
-                'body': body,
-            }
+    Module-level & stateless, so that it can run in the parse executor(other process).
 
-            return post
-        except (AttributeError, KeyError) as er:
-            raise ParserUpdateRequiredError(self.config.name, "Website HTML structure may has been changed.")
+    Args:
+        markup (str): response.text
+        parser (str): markup parser backend(birdman.stream.parsers).
+        name (str): name of the streamer, for error messages.
 
-        raise UnknownError(self.config.name)
+    Returns:
+        post (dict): Dict object containing relevant information about the post
+    """
+    try:
+        soup = get_backend(parser).subtree(markup, 'div', {'class': 'containerInner'})
+        if '존재하지 않는 게시판입니다.' in str(soup):
+            raise ParserUpdateRequiredError(name, "Board does not exists in TodayHumor.")
+
+        post_info = soup.find('div', attrs={'class': 'writerInfoContents'})
+
+        user_id = post_info.find('span', attrs={'id': 'viewPageWriterNameSpan'})['mn']
+        nickname = post_info.find('span', attrs={'id': 'viewPageWriterNameSpan'})['name']
+
+        view_updn = post_info.find('span', attrs={'class', 'view_ok_nok'}).getText()
+        if '/' not in view_updn:
+            view_up = int(view_updn)
+            view_dn = 0
+        else:
+            view_up = int(view_updn.split('/')[0])
+            view_dn = int(view_updn.split('/')[0])
+
+        for div in post_info.find_all('div'):
+            if u'등록시간' in div.get_text():
+                timestamp = div.getText().strip().replace(u'등록시간 : ', '')
+                timestamp = datetime.strptime(timestamp, "%Y/%m/%d %H:%M:%S").isoformat()
+            elif u'조회수' in div.get_text():
+                view_cnt = int(div.getText().replace(u'조회수 : ', ''))
+            elif u'댓글' in div.get_text():
+                comment_cnt = int(div.getText().replace(u'댓글 : ', '').replace(u'개', ''))
+            elif 'IP' in div.get_text():
+                user_ip = div.getText().replace('IP : ', '')
+
+        title = soup.find('div', attrs={'class': 'viewSubjectDiv'}).getText().strip()
+
+        body = soup.find('div', attrs={'class': 'viewContent'}).get_text('\n', strip=True)
+
+        post = {
+            'user_id': user_id,
+            'user_ip': user_ip,
+            'nickname': nickname,
+
+            'title': title,
+            'written_at': timestamp,
+
+            'view_up': view_up,
+            'view_dn': view_dn,
+            'view_cnt': view_cnt,
+            'comment_cnt': comment_cnt,
+            'body': body,
+        }
+
+        return post
+    except (AttributeError, KeyError) as er:
+        raise ParserUpdateRequiredError(name, "Website HTML structure may has been changed.")
+
+    raise UnknownError(name)
 
 
 async def main():
@@ -97,6 +97,8 @@ class BirdmanTwitterAsyncStream(tweepy.asynchronous.AsyncStream):
         )
 
         self.words = config.word_list
+        # SessionFactory shared by Birdman(if any)
+        self.session_factory = None
 
         colorama.init()
 
@@ -172,11 +174,15 @@ class BirdmanTwitterAsyncStream(tweepy.asynchronous.AsyncStream):
         oauth_client = OAuthClient(self.consumer_key, self.consumer_secret,
                                    self.access_token, self.access_token_secret)
 
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                headers={"User-Agent": self.user_agent},
-                timeout=aiohttp.ClientTimeout(sock_read=stall_timeout)
-            )
+        if self.session_factory is not None:
+            self.session = await self.session_factory.get()
+        elif self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        # Session may be shared; set streaming options on each request instead
+        if headers is None:
+            headers = {}
+        headers = {"User-Agent": self.user_agent, **headers}
+        timeout = aiohttp.ClientTimeout(sock_read=stall_timeout)
 
         url = f"https://stream.twitter.com/1.1/{endpoint}.json"
         url = str(URL(url).with_query(sorted(params.items())))
@@ -189,7 +195,7 @@ class BirdmanTwitterAsyncStream(tweepy.asynchronous.AsyncStream):
                 try:
                     async with self.session.request(
                         method, request_url, headers=request_headers,
-                        data=request_body, proxy=self.proxy
+                        data=request_body, proxy=self.proxy, timeout=timeout
                     ) as resp:
                         if resp.status == 200:
                             error_count = 0
@@ -236,7 +242,9 @@ class BirdmanTwitterAsyncStream(tweepy.asynchronous.AsyncStream):
         except Exception as e:
             await self.on_exception(e)
         finally:
-            await self.session.close()
+            # Shared session is closed by its owner
+            if self.session_factory is None:
+                await self.session.close()
             await self.on_disconnect()
 
             
@@ -278,14 +286,21 @@ class TwitterKeywordStreamer(BaseStreamer):
     TwitterKeywordStreamer filters tweets by keywords using tweepy asynchronous API.
     (Basically, this class is a birdman wrapper for tweepy.)
     """
+
+    # The filter stream ends only when it gives up reconnecting
+    endless = True
+
     def __init__(self, config_obj):
         """
         """
         self.config = TwitterKeywordStreamerConfig(config_obj)
         self._stream = BirdmanTwitterAsyncStream(self.config)
-        self._task = self._stream.filter(track=self.config.word_list, filter_level='None')
 
         self.set_logger()
+
+    def set_session_factory(self, session_factory):
+        super(TwitterKeywordStreamer, self).set_session_factory(session_factory)
+        self._stream.session_factory = session_factory
     
     def summary(self, result):
         for word in self.config.word_list:
@@ -312,7 +327,8 @@ class TwitterKeywordStreamer(BaseStreamer):
         self.logger.debug(text)
     
     async def job(self):
-        async for result in self._task:
+        # A new connection on every(re)start; the stream ends when it gives up reconnecting
+        async for result in self._stream.filter(track=self.config.word_list, filter_level='None'):
             if not result:
                 continue
             if self.config.verbose:
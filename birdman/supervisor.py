@@ -0,0 +1,105 @@
+"""Restarts of crashed streamers, with exponential backoff and a restart budget."""
+import asyncio
+import collections
+import logging
+import random
+import time
+
+from birdman import metrics
+from birdman.error import StreamEndedError
+
+
+class Supervisor(object):
+    """Supervisor decides when a crashed streamer(or backfill) is restarted, so that a failure stays in its board:
+    the other streamers keep running, and the crashed one is restarted alone after a backoff.
+
+    The backoff doubles with every crash of the same streamer within `window` seconds,
+    from `base_delay` up to `max_delay`, and is randomized by `jitter`(a fraction of the delay)
+    so that boards crashing together(e.g. the site is down) do not come back at once.
+    A streamer crashing more than `max_restarts` times within `window` seconds is given up.
+
+    Config(`supervisor` in the `global` section):
+        base_delay, max_delay: seconds
+        jitter: fraction of the delay, e.g. 0.5 waits 50%~150% of it
+        max_restarts: restart budget in the window(None for no limit)
+        window: seconds
+
+    Methods:
+        crashed: record a crash, and return the seconds to wait before the restart(None to give up).
+        supervise: generate the items of a stream, restarting it on crashes.
+    """
+
+    def __init__(self, obj=None):
+        obj = obj or {}
+        self.base_delay = float(obj.get('base_delay', 1))
+        self.max_delay = float(obj.get('max_delay', 300))
+        self.jitter = min(1.0, max(0.0, float(obj.get('jitter', 0.5))))
+        self.max_restarts = obj.get('max_restarts', 10)
+        self.window = float(obj.get('window', 3600))
+
+        self._crashes = collections.defaultdict(collections.deque)  # name -> times of the crashes in the window
+        self.stats = collections.defaultdict(lambda: {'crashes': 0, 'restarts': 0, 'given_up': False})
+
+    def crashed(self, name, error, logger=None):
+        """Record a crash of streamer `name`.
+
+        Returns:
+            delay (float): seconds to wait before restarting it, or None if the restart budget is spent.
+        """
+        logger = logger or logging.getLogger('birdman.supervisor')
+        now = time.monotonic()
+        crashes = self._crashes[name]
+        crashes.append(now)
+        while crashes[0] < now - self.window:
+            crashes.popleft()
+        stats = self.stats[name]
+        stats['crashes'] += 1
+        metrics.inc('birdman_streamer_crashes_total', streamer=name)
+
+        if self.max_restarts is not None and len(crashes) > self.max_restarts:
+            stats['given_up'] = True
+            logger.error("Crashed %d times in %d seconds; given up: %s" % (len(crashes), self.window, repr(error)))
+            return None
+        delay = min(self.max_delay, self.base_delay * 2 ** (len(crashes) - 1))
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        stats['restarts'] += 1
+        metrics.inc('birdman_streamer_restarts_total', streamer=name)
+        logger.error("Crashed; restart in %.1f seconds: %s" % (delay, repr(error)))
+        return delay
+
+    async def supervise(self, name, start, logger=None, endless=False):
+        """Generate the items of `start()`(an async iterable), starting it again after each crash.
+        Ends when the stream ends, or when the restart budget is spent.
+
+        Args:
+            endless (bool): the stream never ends by itself(BaseStreamer.endless);
+                            its end is a crash(e.g. a passive stream giving up reconnecting), and it is restarted.
+        """
+        while True:
+            source = start().__aiter__()
+            try:
+                while True:
+                    try:
+                        item = await source.__anext__()
+                    except StopAsyncIteration:
+                        if not endless:
+                            return
+                        error = StreamEndedError(name)
+                        break
+                    except (Exception, GeneratorExit) as e:
+                        # Raised by the stream itself(not by closing this generator)
+                        error = e
+                        break
+                    yield item
+            finally:
+                if hasattr(source, 'aclose'):
+                    await source.aclose()
+            delay = self.crashed(name, error, logger)
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    def summary(self):
+        """Crash counts of the streamers that crashed, for the report at exit.
+        """
+        return {name: dict(stats) for name, stats in self.stats.items()}
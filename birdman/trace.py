@@ -0,0 +1,191 @@
+"""Per-post trace spans, written in the Chrome trace format(open with chrome://tracing or ui.perfetto.dev).
+
+A sampled post gets its own track with the spans of its stages:
+`list`(the post list page it was found in), `fetch_post`(and `request`, `parse`, `comments` in it),
+`merge`(from the streamer's yield to the listener process) and `listen:<listener class>`.
+
+Tracing is off until enable(); until then every function returns at once.
+Spans inside a post fetch are attributed through a context variable,
+so request() and parse() need not know which post they are working for.
+
+Worker processes(`processes` > 1) write their own files, with the worker index appended to `path`;
+the listener process records `listen:*` only, since the yield time of a post stays in its worker.
+Timestamps are wall clock, so the files can be loaded together.
+"""
+import contextvars
+import json
+import os
+import time
+import zlib
+from contextlib import contextmanager
+
+
+_tracer = None
+# (streamer name, post_no) of the sampled post fetched by the current task
+_current = contextvars.ContextVar('birdman_trace_item', default=None)
+
+
+def _now():
+    # Wall clock(us), so that the traces of worker processes line up
+    return time.time() * 1e6
+
+
+class Tracer(object):
+    """Tracer keeps the spans of sampled posts in memory, and writes them on close().
+
+    Config(`trace` in the `global` section):
+        path: output file(worker processes write `path` with the worker index appended)
+        sample_rate: fraction of the posts traced(the same posts in every stage and process)
+        max_spans: spans kept at most; later spans are dropped
+    """
+
+    def __init__(self, obj, process_name='birdman'):
+        self.path = obj.get('path', 'birdman_trace.json')
+        self.sample_rate = float(obj.get('sample_rate', 0.01))
+        self.max_spans = int(obj.get('max_spans', 100000))
+        self.pid = os.getpid()
+        self.dropped = 0
+
+        self._events = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0, 'args': {'name': process_name}}]
+        self._spans = 0
+        self._tracks = {}  # (streamer name, post_no) -> tid
+        self._yielded = {}  # (streamer name, post_no) -> time yielded by the streamer
+
+    def sampled(self, name, post_no):
+        # Deterministic, so that every stage(and process) agrees without passing any state
+        key = ('%s:%s' % (name, post_no)).encode('UTF-8')
+        return zlib.crc32(key) < self.sample_rate * 2 ** 32
+
+    def _track(self, item):
+        if item not in self._tracks:
+            tid = self._tracks[item] = len(self._tracks) + 1
+            self._events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                'args': {'name': '%s #%s' % item},
+            })
+        return self._tracks[item]
+
+    def add(self, item, name, started, finished, **args):
+        """Record a span(us) on the track of `item`.
+        """
+        if self._spans >= self.max_spans:
+            self.dropped += 1
+            return
+        self._spans += 1
+        self._events.append({
+            'name': name, 'cat': item[0], 'ph': 'X', 'pid': self.pid, 'tid': self._track(item),
+            'ts': started, 'dur': max(0.0, finished - started),
+            'args': {'streamer': item[0], 'post_no': item[1], **args},
+        })
+
+    def write(self):
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='UTF-8') as file:
+            json.dump({
+                'traceEvents': self._events,
+                'displayTimeUnit': 'ms',
+                'otherData': {'sample_rate': self.sample_rate, 'dropped_spans': self.dropped},
+            }, file, ensure_ascii=False)
+        os.replace(temp, self.path)
+
+
+def enable(obj, process_name='birdman'):
+    """Start tracing with a new tracer(replacing the current one); returns the tracer.
+    """
+    global _tracer
+    _tracer = Tracer(obj, process_name)
+    return _tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def close():
+    """Write the trace file, and stop tracing.
+    """
+    global _tracer
+    if _tracer is not None:
+        _tracer.write()
+        _tracer = None
+
+
+def sampled(name, post_no):
+    return _tracer is not None and post_no is not None and _tracer.sampled(name, post_no)
+
+
+@contextmanager
+def span(name, **args):
+    """Record the enclosed block as a span of the post fetched by the current task(if sampled).
+    Returns the start and end time as a list, for spans shared by several posts(e.g. a post list page).
+    """
+    if _tracer is None:
+        yield None
+        return
+    times = [_now(), None]
+    try:
+        yield times
+    finally:
+        times[1] = _now()
+        item = _current.get()
+        if item is not None and _tracer is not None:
+            _tracer.add(item, name, times[0], times[1], **args)
+
+
+def add_span(name, post_no, streamer, times, **args):
+    """Record a span measured elsewhere(e.g. by span() outside of any post) for a sampled post.
+    """
+    if times is not None and times[1] is not None and sampled(streamer, post_no):
+        _tracer.add((streamer, post_no), name, times[0], times[1], **args)
+
+
+async def fetch(streamer, post_no, func, *args):
+    """Await func(*args), the fetch of a post, tracing it(and every span in it) if sampled.
+    Must run as its own task, so that the post is not attributed to the caller.
+    The coroutine is created here, so that none is left un-awaited if the task is cancelled before it starts.
+    """
+    if not sampled(streamer, post_no):
+        return await func(*args)
+    _current.set((streamer, post_no))
+    with span('fetch_post'):
+        return await func(*args)
+
+
+def yielded(streamer, result):
+    """Mark the time a streamer yields a result; the `merge` span ends when Birdman dispatches it.
+    """
+    if _tracer is not None and isinstance(result, dict) and sampled(streamer, result.get('post_no')):
+        _tracer._yielded.setdefault((streamer, result['post_no']), _now())
+
+
+def dispatched(streamer, result):
+    """Record the `merge` span of a result dispatched to the listeners. Returns the track to trace listeners on.
+    """
+    if _tracer is None or not isinstance(result, dict) or not sampled(streamer, result.get('post_no')):
+        return None
+    item = (streamer, result['post_no'])
+    started = _tracer._yielded.pop(item, None)
+    if started is not None:
+        _tracer.add(item, 'merge', started, _now())
+    return item
+
+
+def discard(streamer, result):
+    """Forget the yield time of a result that is never dispatched(e.g. a duplicate).
+    """
+    if _tracer is not None and isinstance(result, dict):
+        _tracer._yielded.pop((streamer, result.get('post_no')), None)
+
+
+@contextmanager
+def listen(item, listener):
+    """Record a listen() call on the track of `item`(returned by dispatched()).
+    """
+    if item is None or _tracer is None:
+        yield
+        return
+    started = _now()
+    try:
+        yield
+    finally:
+        _tracer.add(item, 'listen:%s' % type(listener).__name__, started, _now())
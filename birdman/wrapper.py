@@ -1,20 +1,56 @@
 # AsyncIO
 import asyncio
-import aiostream
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import suppress
+import inspect
+import logging
+import multiprocessing
+import queue
+import random
+import signal
+import time
 import yaml
 
 from birdman.stream.base import BaseStreamer
+from birdman.stream.active import ActiveStreamer
 from birdman.listen.base import BaseListener
+from birdman.listen.runner import ListenerRunner
+from birdman.listen.routing import RoutingTable
+from birdman.checkpoint import get_checkpoint_store
+from birdman.dedup import Deduplicator
+from birdman.ratelimit import HostRateLimiter
+from birdman.session import SessionFactory
+from birdman.scheduler import CrawlScheduler
+from birdman.refresh import CommentRefresher
+from birdman.backfill import Backfill
+from birdman.ipc import BatchSender, receive_batches
+from birdman.lease import LeaseCoordinator
+from birdman.httpcache import HTTPCache
+from birdman.merge import DynamicMerge
+from birdman.supervisor import Supervisor
+from birdman import control, log, metrics, trace
 
 from birdman.listen import get_listener
 from birdman.stream import get_streamer
 
 
+logger = logging.getLogger('birdman.wrapper')
+
+
+def _set_logger():
+    # Reports of Birdman itself(e.g. at exit); written by the log thread(birdman.log), like the streamer logs.
+    # Set on the parent logger, so that the module loggers(birdman.lease, birdman.supervisor, ...) are covered too
+    parent = logging.getLogger('birdman')
+    parent.setLevel(logging.INFO)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('[%(levelname)s] %(name)s %(asctime)s | %(message)s\n'))
+    log.use_queue(parent, [handler])
+
+
 def init_birdman_from_yaml(file, auth_file=None, encoding='UTF-8'):
     listeners = []
     listener_global = None
-    streamers = []
+    boards = []  # (streamer class, config)
     streamer_global = None
 
     with open(file, 'r', encoding=encoding) as file:
@@ -36,7 +72,9 @@ def init_birdman_from_yaml(file, auth_file=None, encoding='UTF-8'):
                     streamer = {**streamer, **streamer_global}
                     if auth is not None:
                         streamer['auth'] = auth
-                streamers.append(get_streamer(streamer['class'])(streamer))
+                streamer_cls = get_streamer(streamer['class'])
+                for board in _expand_boards(streamer_cls, streamer, encoding):
+                    boards.append((streamer_cls, board))
         for listener in obj['listener']:
             if listener['class'] == 'global':
                 if listener_global is None:
@@ -49,17 +87,140 @@ def init_birdman_from_yaml(file, auth_file=None, encoding='UTF-8'):
                     listener = {**listener, **listener_global}
                 listeners.append(get_listener(listener['class'])(listener))
 
-    return Birdman(streamers, listeners)
+    if streamer_global is not None and streamer_global.get('lease') is not None:
+        # Boards are claimed at runtime; see birdman.lease
+        candidates = {}
+        for streamer_cls, board in boards:
+            key = _lease_key(streamer_cls, board)
+            if key in candidates:
+                raise ValueError("Duplicate board `%s`; set `lease_key` to tell them apart" % key)
+            candidates[key] = (streamer_cls, board)
+        return Birdman([], listeners, streamer_global, candidates=candidates)
+    return Birdman([streamer_cls(board) for streamer_cls, board in boards], listeners, streamer_global)
+
+
+def _lease_key(streamer_cls, obj):
+    """Name of a board in the lease store(same on every node).
+    """
+    if 'lease_key' in obj:
+        return obj['lease_key']
+    board_key = getattr(streamer_cls, 'board_key', None)
+    if board_key is None or board_key not in obj:
+        return obj['class']
+    return '%s:%s' % (obj['class'], obj[board_key])
+
+
+def _expand_boards(streamer_cls, obj, encoding='UTF-8'):
+    """Expand a streamer config declaring many boards at once
+    into a config per board, sharing everything else as a template.
+
+    Args:
+        streamer_cls (type): streamer class; its `board_key` is the config key of a board id.
+        obj (dict): streamer config with `boards`(list of board ids)
+                    and/or `boards_file`(a board id per line, `#` for comments).
+
+    Returns:
+        list of configs(dict)
+    """
+    if 'boards' not in obj and 'boards_file' not in obj:
+        return [obj]
+    board_key = getattr(streamer_cls, 'board_key', None)
+    if board_key is None:
+        raise ValueError("`boards` is not supported by streamer class `%s`" % obj['class'])
+
+    boards = list(obj.get('boards', []))
+    if 'boards_file' in obj:
+        with open(obj['boards_file'], 'r', encoding=encoding) as file:
+            for line in file:
+                line = line.split('#')[0].strip()
+                if line:
+                    boards.append(line)
+
+    template = {key: value for key, value in obj.items() if key not in ('boards', 'boards_file')}
+    return [{**template, board_key: board} for board in boards]
+
+
+class BirdmanConfig(object):
+    """Config object for Birdman.
+    """
+
+    def __init__(self, obj):
+        """
+        Args:
+            obj (dict): result of YAML parsing(`global` section of streamers).
+        """
+        # Per-host token buckets shared by all streamers.
+        # {host: {rate: requests per second, burst: bucket size}}, `default` for unlisted hosts
+        self.rate_limit = obj.get('rate_limit', None)
+        # Options of the shared connection pool; see birdman.session.SessionFactory
+        self.connection = obj.get('connection', None)
+        # Number of processes for HTML parsing; 0 parses in the event loop
+        self.parse_workers = int(obj.get('parse_workers', 0))
+        # If given, epochs of all active streamers run on a CrawlScheduler; see birdman.scheduler
+        # {workers: max epochs in flight, spread: seconds, queue_size: int}
+        self.scheduler = obj.get('scheduler', None)
+        # If given, crawl cursors of active streamers survive restarts; see birdman.checkpoint
+        # {backend: 'sqlite', path: database file, flush_interval: seconds}
+        self.checkpoint = obj.get('checkpoint', None)
+        # If given, results already emitted are not passed to listeners again; see birdman.dedup
+        # {capacity: exact keys, bloom_capacity: keys, error_rate: float, path: state file}
+        self.dedup = obj.get('dedup', None)
+        # If given, comments of crawled posts are re-fetched and new ones are emitted; see birdman.refresh
+        # {first_delay, backoff, max_refreshes, max_age: seconds, capacity, rate, burst, workers}
+        self.refresh = obj.get('refresh', None)
+        # Number of worker processes for streamers; 1 runs everything in this process
+        self.processes = max(1, int(obj.get('processes', 1)))
+        # Batching & backpressure of results sent from the worker processes
+        # {batch_size: items, batch_interval: seconds, queue_size: batches}
+        self.ipc = obj.get('ipc', None) or {}
+        # Restarts of crashed streamers; see birdman.supervisor
+        # {base_delay, max_delay: seconds, jitter: fraction of the delay, max_restarts: int, window: seconds}
+        self.supervisor = obj.get('supervisor', None) or {}
+        # If given, boards are claimed through leases shared with other nodes; see birdman.lease
+        # {backend: 'sqlite'(path) or 'tcp'(host, port), node, ttl, renew_interval}
+        self.lease = obj.get('lease', None)
+        # If given, responses are recorded to(or replayed from) a file; see birdman.httpcache
+        # {mode: 'record' or 'replay', path: database file}
+        self.http_cache = obj.get('http_cache', None)
+        # If given, metrics are served in the Prometheus text format at http://host:port/metrics; see birdman.metrics
+        # {host, port}; worker processes serve on the following ports(port + 1 + index)
+        self.metrics = obj.get('metrics', None)
+        # If given, the stages of sampled posts are traced to a Chrome trace file; see birdman.trace
+        # {path: output file, sample_rate: fraction of posts, max_spans: int}
+        self.trace = obj.get('trace', None)
+        # If given, streamers and listeners can be added or removed over HTTP while running; see birdman.control
+        # {host, port}; Birdman keeps running with no streamer left, until stopped
+        self.control = obj.get('control', None)
+        if self.lease is not None:
+            if self.processes > 1:
+                raise ValueError("`lease` cannot be used with multiple `processes`")
+            # Claimed boards are added to the scheduler
+            self.scheduler = self.scheduler if self.scheduler is not None else {}
+        if self.control is not None and self.processes > 1:
+            raise ValueError("`control` cannot be used with multiple `processes`")
 
 
 class Birdman(object):
     """Wrapper class that encapsulates the whole asynchronous routine.
     Provides interface that can modify streamers and listeners in the middle of a run.
+
+    With `processes` > 1, streamers are partitioned across worker processes(each with its own loop & resources),
+    and their results are sent in batches to this process, which runs the listeners.
     """
 
-    def __init__(self, streamers, listeners):
-        self._streamers = streamers
-        self._listeners = listeners
+    def __init__(self, streamers, listeners, config_obj=None, candidates=None):
+        """
+        Args:
+            streamers (list): BaseStreamer instances.
+            listeners (list): BaseListener instances.
+            config_obj (dict): result of YAML parsing(`global` section of streamers).
+            candidates (dict): with `lease`, boards to claim at runtime; lease key -> (streamer class, config).
+        """
+        self.config = BirdmanConfig(config_obj or {})
+        self._config_obj = config_obj or {}
+        _set_logger()
+        self._streamers = list(streamers)
+        self._listeners = list(listeners)
 
         for streamer in streamers:
             if not isinstance(streamer, BaseStreamer):
@@ -68,42 +229,505 @@ class Birdman(object):
             if not isinstance(listener, BaseListener):
                 raise ValueError("`listeners` argument must be an iterable of BaseListener instances")
 
+        self._supervisor = Supervisor(self.config.supervisor)
+        # Worker processes open their own file stores
+        self._setup_streamers(streamers, stores=self.config.processes <= 1)
+        self._dedup = Deduplicator(self.config.dedup) if self.config.dedup is not None else None
+        # Worker processes refresh the posts they crawl, on their own share of the rate limits
+        self._refresher = None
+        if self.config.processes <= 1:
+            self._setup_refresher(streamers)
+        self._workers = []
+        self._runners = []  # ListenerRunner of each listener, while streaming
+        self._routes = RoutingTable()  # streamer name -> runners
+        self._merge = None  # DynamicMerge of the sources, while streaming
+        self._removed = set()  # names of the streamers removed while streaming
+        self._metrics_runner = None
+        self._control_runner = None
+        if self.config.metrics is not None:
+            metrics.enable()
+            metrics.add_collector(self._queue_depths)
+            metrics.add_collector(self._recrawl_intervals)
+        if self.config.trace is not None:
+            trace.enable(self.config.trace)
+        self._coordinator = None
+        self._leased = {}  # lease key -> streamer
+        if self.config.lease is not None:
+            self._coordinator = LeaseCoordinator(
+                candidates or {}, self._claim_board, self._release_board, self.config.lease
+            )
+
+    def _setup_streamers(self, streamers, stores=True, share=1):
+        """Create the resources shared by `streamers`(all streamers of the process), and inject them.
+
+        Args:
+            stores (bool): open the file stores(checkpoint store and HTTP cache, if configured).
+            share (int): number of processes sharing the per-host rate limits.
+        """
+        rate_limit = {
+            host: {**limit, 'rate': limit['rate'] / share} for host, limit in (self.config.rate_limit or {}).items()
+        }
+        self._rate_limiter = HostRateLimiter(rate_limit)
+        self._session_factory = SessionFactory(self.config.connection)
+        self._parse_executor = None
+        # Worker processes parse in their own loops
+        if self.config.parse_workers > 0 and self.config.processes <= 1:
+            self._parse_executor = ProcessPoolExecutor(max_workers=self.config.parse_workers)
+        self._checkpoint_store = None
+        if self.config.checkpoint is not None and stores:
+            self._checkpoint_store = get_checkpoint_store(self.config.checkpoint)
+        self._http_cache = None
+        if self.config.http_cache is not None and stores:
+            self._http_cache = HTTPCache(self.config.http_cache)
+
+        for streamer in streamers:
+            self._share_resources(streamer)
+
+        # Active streamers are crawled by a single scheduler instead of their own coroutines
+        self._scheduler = None
+        if self.config.scheduler is not None:
+            self._scheduler = CrawlScheduler(
+                [streamer for streamer in streamers if isinstance(streamer, ActiveStreamer)],
+                self.config.scheduler, supervisor=self._supervisor
+            )
+
+    def _setup_refresher(self, streamers, share=1):
+        """Create the comment refresher of `streamers`(all streamers of the process), if configured.
+
+        Args:
+            share (int): number of processes sharing the refresh budget.
+        """
+        self._refresher = None
+        if self.config.refresh is not None:
+            obj = {**self.config.refresh, 'rate': self.config.refresh.get('rate', 0.5) / share}
+            self._refresher = CommentRefresher(
+                [streamer for streamer in streamers if isinstance(streamer, ActiveStreamer)], obj
+            )
+
+    def _share_resources(self, streamer):
+        streamer.set_session_factory(self._session_factory)
+        if isinstance(streamer, ActiveStreamer):
+            streamer.set_rate_limiter(self._rate_limiter)
+            streamer.set_parse_executor(self._parse_executor)
+            if self._checkpoint_store is not None:
+                streamer.set_checkpoint_store(self._checkpoint_store)
+            if self._http_cache is not None:
+                streamer.set_http_cache(self._http_cache)
+
+    def _find(self, items, name, kind):
+        for item in items:
+            if (item.config.name if kind == 'streamer' else item.name) == name:
+                return item
+        raise KeyError("No %s named `%s`" % (kind, name))
+
+    def add_streamer(self, streamer, delay=0):
+        """Add a streamer. While running, it starts at once, without disturbing the other streamers.
+
+        Args:
+            streamer (BaseStreamer): streamer to add; its name must not be used by another streamer.
+            delay (float): seconds before the first epoch, with the scheduler.
+        """
+        if not isinstance(streamer, BaseStreamer):
+            raise ValueError("`streamer` must be a BaseStreamer instance")
+        if self._workers:
+            raise ValueError("Streamers cannot be added to a run with multiple `processes`")
+        name = streamer.config.name
+        if any(other.config.name == name for other in self._streamers):
+            raise ValueError("Streamer `%s` already exists" % name)
+        self._share_resources(streamer)
+        self._streamers.append(streamer)
+        self._removed.discard(name)
+        self._routes.route(name)
+        active = isinstance(streamer, ActiveStreamer)
+        if self._scheduler is not None and active:
+            self._scheduler.add(streamer, delay=delay)
+        elif self._merge is not None:
+            self._merge.add(('stream', id(streamer)), self._supervised(streamer))
+        if self._merge is not None and active and streamer.config.backfill is not None:
+            self._merge.add(('backfill', id(streamer)), self._supervised_backfill(streamer))
+        if self._refresher is not None and active:
+            self._refresher.add(streamer)
+
+    async def remove_streamer(self, streamer):
+        """Stop and close a streamer(BaseStreamer, or its name), cancelling its epoch in flight.
+        No result of the streamer is dispatched after this returns.
+        """
+        if isinstance(streamer, str):
+            streamer = self._find(self._streamers, streamer, 'streamer')
+        if self._workers:
+            raise ValueError("Streamers cannot be removed from a run with multiple `processes`")
+        if self._scheduler is not None:
+            await self._scheduler.remove(streamer)
+        if self._merge is not None:
+            await self._merge.remove(('stream', id(streamer)))
+            await self._merge.remove(('backfill', id(streamer)))
+        self._streamers.remove(streamer)
+        # Results already queued(in the merge, the scheduler or the refresher) are dropped
+        self._removed.add(streamer.config.name)
+        self._routes.forget(streamer.config.name)
+        if self._refresher is not None:
+            self._refresher.remove(streamer)
+        await streamer.close()
+
+    def add_listener(self, listener):
+        """Add a listener. While running, it listens to the results dispatched from now on.
+        """
+        if not isinstance(listener, BaseListener):
+            raise ValueError("`listener` must be a BaseListener instance")
+        if any(other.name == listener.name for other in self._listeners):
+            raise ValueError("Listener `%s` already exists; set `name` to tell them apart" % listener.name)
+        self._listeners.append(listener)
+        if self._merge is not None:
+            runner = ListenerRunner(listener, self._removed)
+            self._runners.append(runner)
+            self._routes.add(runner, listener.listen_to)
+
+    async def remove_listener(self, listener):
+        """Remove and close a listener(BaseListener, or its name), after it finishes the results queued for it.
+        """
+        if isinstance(listener, str):
+            listener = self._find(self._listeners, listener, 'listener')
+        for runner in [runner for runner in self._runners if runner.listener is listener]:
+            self._routes.remove(runner)
+            self._runners.remove(runner)
+            await runner.close()
+        self._listeners.remove(listener)
+        await self._close_listener(listener)
+
+    @staticmethod
+    async def _close_listener(listener):
+        # close() of a listener may be a coroutine function
+        closed = listener.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+    def _claim_board(self, key, candidate):
+        """Start crawling a board claimed by the lease coordinator.
+        """
+        streamer_cls, obj = candidate
+        streamer = streamer_cls(obj)
+        # Spread the first epochs of the boards claimed at once
+        self.add_streamer(streamer, delay=random.uniform(0, self._scheduler.spread))
+        self._leased[key] = streamer
+
+    async def _release_board(self, key):
+        """Stop crawling a board whose lease is lost(or given up), including its epoch in flight.
+        """
+        streamer = self._leased.pop(key)
+        # May have been removed through the control endpoint already
+        if streamer in self._streamers:
+            await self.remove_streamer(streamer)
+
+    async def _flush_checkpoints(self):
+        """Commit the checkpoints staged by streamers periodically(a single transaction per interval).
+        """
+        interval = self.config.checkpoint.get('flush_interval', 5)
+        while True:
+            await asyncio.sleep(interval)
+            self._checkpoint_store.flush()
+
+    def _supervised(self, streamer):
+        """stream() of `streamer`, restarted alone when it crashes(or ends).
+        """
+        return self._supervisor.supervise(
+            streamer.config.name, streamer.stream, getattr(streamer, 'logger', None), endless=streamer.endless
+        )
+
+    def _supervised_backfill(self, streamer):
+        backfill = Backfill(streamer, self._checkpoint_store)
+        return self._supervisor.supervise(backfill.name, backfill.stream, getattr(streamer, 'logger', None))
+
+    def _sources(self):
+        """Streams of (name, item) from the streamers of this process, with their keys in the merge.
+        """
+        sources = [
+            (('stream', id(streamer)), self._supervised(streamer)) for streamer in self._streamers
+            if self._scheduler is None or not isinstance(streamer, ActiveStreamer)
+        ]
+        if self._scheduler is not None:
+            sources.append(('scheduler', self._scheduler.stream()))
+        sources.extend(
+            (('backfill', id(streamer)), self._supervised_backfill(streamer)) for streamer in self._streamers
+            if isinstance(streamer, ActiveStreamer) and streamer.config.backfill is not None
+        )
+        if self._refresher is not None:
+            sources.append(('refresh', self._refresher.stream()))
+        return sources
+
+    async def _dispatch(self, name, item):
+        if name in self._removed:
+            trace.discard(name, item)
+            return
+        metrics.inc('birdman_items_total', streamer=name)
+        if self._dedup is not None and self._dedup.seen(name, item):
+            metrics.inc('birdman_duplicates_total', streamer=name)
+            trace.discard(name, item)
+            return
+        if self._refresher is not None:
+            self._refresher.track(name, item)
+        track = trace.dispatched(name, item)
+        for runner in self._routes.route(name):
+            await runner.put(item, track, name)
+
+    def _start_runners(self):
+        self._runners = [ListenerRunner(listener, self._removed) for listener in self._listeners]
+        self._routes = RoutingTable()
+        for runner in self._runners:
+            self._routes.add(runner, runner.listener.listen_to)
+        for streamer in self._streamers:
+            self._routes.route(streamer.config.name)
+
+    async def _close_runners(self, timeout=10):
+        """Let the listeners finish their queues, and report the results dropped by the overflow policies.
+        """
+        for runner in self._runners:
+            await runner.close(timeout)
+            if runner.dropped:
+                logger.warning("Listener %s dropped %d results(overflow: %s)" % (
+                    runner.name, runner.dropped, runner.listener.overflow
+                ))
+        self._runners = []
+        self._routes = RoutingTable()
+
+    def _queue_depths(self):
+        """Metrics collector of the queues of this process.
+        """
+        depths = []
+        if self._scheduler is not None:
+            depths.append(('birdman_queue_depth', {'queue': 'scheduler'}, self._scheduler.queue_depth))
+        if self._merge is not None:
+            depths.append(('birdman_queue_depth', {'queue': 'merge'}, self._merge.queue_depth))
+        if self._refresher is not None:
+            depths.append(('birdman_queue_depth', {'queue': 'refresh'}, self._refresher.queue_depth))
+        if self._workers:
+            try:
+                depths.append(('birdman_queue_depth', {'queue': 'ipc'}, self._channel.qsize()))
+            except NotImplementedError:
+                # Queue.qsize() is not available on macOS
+                pass
+        for runner in self._runners:
+            depths.append(('birdman_queue_depth', {'queue': 'listener:%s' % runner.name}, runner.queue_depth))
+        return depths
+
+    def _recrawl_intervals(self):
+        """Metrics collector of the recrawl policies of the active streamers crawled in this process.
+        """
+        samples = []
+        if self._workers:
+            # Crawled by the worker processes
+            return samples
+        for streamer in self._streamers:
+            if not isinstance(streamer, ActiveStreamer):
+                continue
+            labels = {'streamer': streamer.config.name}
+            samples.append(('birdman_recrawl_interval_seconds', labels, streamer.next_recrawl_interval()))
+            rate = getattr(streamer.recrawl_policy, 'rate', None)
+            if rate is not None:
+                samples.append(('birdman_recrawl_rate', labels, rate))
+        return samples
+
+    async def _serve_metrics(self, index=None):
+        host = self.config.metrics.get('host', '127.0.0.1')
+        port = self.config.metrics.get('port', 9108)
+        if index is not None:
+            port += 1 + index
+        self._metrics_runner = await metrics.serve(host, port)
+
+    async def _close_metrics(self):
+        if self._metrics_runner is not None:
+            await self._metrics_runner.cleanup()
+            self._metrics_runner = None
+
+    async def _close_control(self):
+        if self._control_runner is not None:
+            await self._control_runner.cleanup()
+            self._control_runner = None
+
     async def _stream_routine(self):
         """Asynchronous streaming & listening starts here.
         """
-        self._stream = aiostream.stream.merge(*[
-            streamer.stream() for streamer in self._streamers
-        ])
-        async with self._stream.stream() as streamer:
-            async for name, item in streamer:
-                for listener in self._listeners:
-                    if (listener.listen_to is None) or (name in listener.listen_to):
-                        listener.listen(item)
+        if self.config.metrics is not None:
+            await self._serve_metrics()
+        if self._checkpoint_store is not None:
+            asyncio.ensure_future(self._flush_checkpoints())
+        if self._coordinator is not None:
+            asyncio.ensure_future(self._coordinator.run())
+        # Sources are added to(and removed from) the merge while running
+        self._merge = DynamicMerge(keep_alive=self.config.control is not None)
+        if self._workers:
+            self._merge.add('ipc', receive_batches(self._channel, len(self._workers)))
+        else:
+            for key, source in self._sources():
+                self._merge.add(key, source)
+        self._start_runners()
+        if self.config.control is not None:
+            self._control_runner = await control.serve(
+                self, self.config.control.get('host', '127.0.0.1'), self.config.control.get('port', 9109)
+            )
+        async for name, item in self._merge:
+            await self._dispatch(name, item)
+
+    def _start_workers(self):
+        """Fork the worker processes, each crawling a partition of the streamers.
+        """
+        processes = self.config.processes
+        context = multiprocessing.get_context('fork')
+        self._channel = context.Queue(maxsize=self.config.ipc.get('queue_size', 256))
+        self._stop = context.Event()
+        self._workers = []
+        for index in range(processes):
+            worker = context.Process(
+                target=self._run_worker, args=(self._streamers[index::processes], index),
+                name='birdman-worker-%d' % index, daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    async def _stop_workers(self, timeout=10):
+        """Stop the worker processes, and dispatch the results they send until exit.
+        """
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        senders = len(self._workers)
+        while senders > 0 and time.monotonic() < deadline:
+            try:
+                batch = await self.loop.run_in_executor(None, self._channel.get, True, 0.1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in self._workers):
+                    break
+                continue
+            if batch is None:
+                senders -= 1
+                continue
+            for name, item in batch:
+                await self._dispatch(name, item)
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.monotonic()))
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+    def _run_worker(self, streamers, index):
+        """Entry point of a worker process.
+        """
+        # The listener process stops the workers on KeyboardInterrupt
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self._streamers = streamers
+        self._workers = []
+        self._setup_streamers(streamers, share=self.config.processes)
+        self._setup_refresher(streamers, share=self.config.processes)
+        # Keep the loop inherited from the listener process from being collected(and closed);
+        # closing it unregisters its self-pipe from the epoll instance shared with the listener process
+        self._inherited_loop = self.loop
+        if self.config.trace is not None:
+            path = self.config.trace.get('path', 'birdman_trace.json')
+            trace.enable({**self.config.trace, 'path': '%s.%d' % (path, index)}, 'birdman-worker-%d' % index)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            if self.config.metrics is not None:
+                self.loop.run_until_complete(self._serve_metrics(index))
+            self.loop.run_until_complete(self._worker_routine())
+        finally:
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.run_until_complete(self._close_metrics())
+            for streamer in streamers:
+                self.loop.run_until_complete(streamer.close())
+            self.loop.run_until_complete(self._session_factory.close())
+            if self._checkpoint_store is not None:
+                self._checkpoint_store.close()
+            if self._http_cache is not None:
+                self._http_cache.close()
+            trace.close()
+            self.loop.close()
+            # Worker processes exit without atexit handlers
+            log.stop()
+
+    async def _wait_stop(self):
+        # Poll instead of Event.wait() in a thread; a worker exiting while a thread waits on the event
+        # leaves a sleeper that is never woken, and the listener process hangs in Event.set()
+        while not self._stop.is_set():
+            await asyncio.sleep(0.5)
+
+    async def _pump(self, sender):
+        merge = DynamicMerge()
+        for key, source in self._sources():
+            merge.add(key, source)
+        try:
+            async for name, item in merge:
+                # Duplicates are dropped by the listener process; the refresher tracks a post once anyway
+                if self._refresher is not None:
+                    self._refresher.track(name, item)
+                # The `merge` span of a worker ends here; the listener process traces the listeners
+                trace.dispatched(name, item)
+                await sender.send(name, item)
+        finally:
+            await merge.close()
+
+    async def _worker_routine(self):
+        """Crawl the streamers of this worker process, and send the results to the listener process.
+        """
+        if self._checkpoint_store is not None:
+            asyncio.ensure_future(self._flush_checkpoints())
+        sender = BatchSender(
+            self._channel, self.config.ipc.get('batch_size', 64), self.config.ipc.get('batch_interval', 0.2)
+        )
+        pump = asyncio.ensure_future(self._pump(sender))
+        stop = asyncio.ensure_future(self._wait_stop())
+        try:
+            await asyncio.wait([pump, stop], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (pump, stop):
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+            await sender.close()
 
     def start(self):
         """Main entry point of the Birdman object.
         """
         self.loop = asyncio.get_event_loop()
-        retry = False
 
         try:
+            if self.config.processes > 1:
+                self._start_workers()
             self.loop.run_until_complete(self._stream_routine())
         except KeyboardInterrupt:
             print("KeyboardInterrupt has occured; Terminated by user")
-        except GeneratorExit:
-            print("Generator exited. retry")
-            retry = True
         finally:
-            # Cancel all pending tasks
-            for task in asyncio.Task.all_tasks():
-                with suppress(asyncio.CancelledError):
+            # Cancel all pending tasks; listeners finish their queues below
+            self._merge = None
+            listening = set(runner.task for runner in self._runners)
+            for task in asyncio.all_tasks(self.loop):
+                if task not in listening:
                     task.cancel()
+            if self._workers:
+                self.loop.run_until_complete(self._stop_workers())
+            if self._coordinator is not None:
+                self.loop.run_until_complete(self._coordinator.close())
+            self.loop.run_until_complete(self._close_metrics())
+            self.loop.run_until_complete(self._close_control())
             # call close() for all streamers and listeners
             for streamer in self._streamers:
                 self.loop.run_until_complete(streamer.close())
+            self.loop.run_until_complete(self._session_factory.close())
+            if self._checkpoint_store is not None:
+                self._checkpoint_store.close()
+            if self._http_cache is not None:
+                self._http_cache.close()
+            if self._dedup is not None:
+                logger.info("Duplicates suppressed: %(suppressed)d of %(checked)d" % self._dedup.stats)
+                self._dedup.save()
+            for name, stats in self._supervisor.summary().items():
+                logger.warning("Streamer %s crashed %d times(%s)" % (
+                    name, stats['crashes'], 'given up' if stats['given_up'] else '%d restarts' % stats['restarts']
+                ))
+            if self._parse_executor is not None:
+                self._parse_executor.shutdown(wait=False)
+            self.loop.run_until_complete(self._close_runners())
             for listener in self._listeners:
-                listener.close()
+                self.loop.run_until_complete(self._close_listener(listener))
+            trace.close()
             # Shutdown the main loop
             self.loop.close()
-            if retry:
-                self.start()
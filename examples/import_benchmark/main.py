@@ -0,0 +1,88 @@
+"""Startup(import) time benchmark of Birdman.
+
+Each scenario runs `--runs` times in a fresh interpreter, and prints the results as JSON:
+median seconds to import birdman and resolve the classes, and the third-party modules loaded.
+
+    lazy:  import birdman, then get_streamer()/get_listener() of the classes given(as a YAML config would)
+    eager: import birdman, then every streamer & listener module(what `import birdman` used to do)
+
+Run from the repository root, e.g.:
+
+    python examples/import_benchmark/main.py --streamers dcinside --listeners text
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Third-party modules whose import is reported
+WATCHED = ['aiohttp', 'aiostream', 'bs4', 'colorama', 'html5lib', 'lxml', 'oauthlib', 'tweepy', 'yaml']
+
+SCENARIO = r'''
+import json, sys, time
+started = time.perf_counter()
+import birdman
+from birdman.listen import get_listener, listener_names
+from birdman.stream import get_streamer, streamer_names
+streamers, listeners, eager = json.loads(sys.argv[1])
+if eager:
+    streamers, listeners = streamer_names(), listener_names()
+for name in streamers:
+    get_streamer(name)
+for name in listeners:
+    get_listener(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'modules': sorted(set(name.split('.')[0] for name in sys.modules))}))
+'''
+
+
+def run(streamers, listeners, eager, runs):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')]))}
+    seconds = []
+    modules = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', SCENARIO, json.dumps([streamers, listeners, eager])],
+            env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout
+        result = json.loads(output)
+        seconds.append(result['seconds'])
+        modules = result['modules']
+    return {
+        'seconds': statistics.median(seconds),
+        'third_party': [name for name in WATCHED if name in modules],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streamers', nargs='*', default=['dcinside'], help="streamer classes of the config")
+    parser.add_argument('--listeners', nargs='*', default=['text'], help="listener classes of the config")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', default=None, help="write the JSON result to this file")
+    args = parser.parse_args()
+
+    lazy = run(args.streamers, args.listeners, False, args.runs)
+    eager = run(args.streamers, args.listeners, True, args.runs)
+    result = {
+        'streamers': args.streamers,
+        'listeners': args.listeners,
+        'runs': args.runs,
+        'lazy': lazy,
+        'eager': eager,
+        'saved_seconds': eager['seconds'] - lazy['seconds'],
+    }
+    output = json.dumps(result, indent=2)
+    if args.output is not None:
+        with open(args.output, 'w', encoding='UTF-8') as file:
+            file.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Check that every markup parser backend gives the same parse results, and the expected ones.
+
+pages/ is the parity corpus: list, post and comment pages of DCInside and TodayHumor,
+named `<site>[_<label>]_<kind>.<ext>`(kind: list, post or comment).
+expected/ holds the parse result of each page(JSON); the check fails if any backend gives another result,
+or if a page cannot be parsed at all.
+
+Whenever a site changes its HTML, save pages of a board with --capture, review them,
+and record their results with --update. Run from the repository root:
+
+    python examples/parser_parity/main.py --capture dcinside:cat todayhumor:animal
+    python examples/parser_parity/main.py --update
+    python examples/parser_parity/main.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from birdman.stream import dcinside, todayhumor, get_streamer
+from birdman.stream.parsers import _backends
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGES = os.path.join(HERE, 'pages')
+EXPECTED = os.path.join(HERE, 'expected')
+
+# (site, kind) -> parse function; markup parsers take (markup, backend, name), the others (text, name)
+PARSERS = {
+    ('dcinside', 'list'): dcinside.parse_post_list,
+    ('dcinside', 'post'): dcinside.parse_post,
+    ('dcinside', 'comment'): dcinside.parse_comments,
+    ('todayhumor', 'list'): todayhumor.parse_post_list,
+    ('todayhumor', 'post'): todayhumor.parse_post,
+}
+MARKUP = ('list', 'post')
+
+
+def check_page(filename, update=False):
+    stem = os.path.splitext(filename)[0]
+    site, kind = stem.split('_', 1)[0], stem.rsplit('_', 1)[1]
+    parse = PARSERS[(site, kind)]
+    with open(os.path.join(PAGES, filename), 'r', encoding='UTF-8') as file:
+        markup = file.read()
+
+    results = {}
+    for backend in (sorted(_backends) if kind in MARKUP else ['-']):
+        start = time.perf_counter()
+        try:
+            if kind in MARKUP:
+                results[backend] = parse(markup, backend, filename)
+            else:
+                results[backend] = parse(markup, filename)
+        except Exception as e:
+            print("  %-12s ERROR: %r" % (backend, e))
+            return False
+        print("  %-12s %7.2f ms" % (backend, (time.perf_counter() - start) * 1000))
+    # JSON round trip, to compare with the expected results as they are stored
+    results = {backend: json.loads(json.dumps(result)) for backend, result in results.items()}
+
+    reference = results.get('html5lib', results.get('-'))
+    if not reference:
+        print("  EMPTY: nothing is parsed from the page")
+        return False
+
+    expected_path = os.path.join(EXPECTED, stem + '.json')
+    if update:
+        os.makedirs(EXPECTED, exist_ok=True)
+        with open(expected_path, 'w', encoding='UTF-8') as file:
+            json.dump(reference, file, ensure_ascii=False, indent=2)
+            file.write('\n')
+    if not os.path.exists(expected_path):
+        print("  MISSING: %s(record it with --update)" % os.path.relpath(expected_path, HERE))
+        return False
+    with open(expected_path, 'r', encoding='UTF-8') as file:
+        expected = json.load(file)
+
+    mismatch = [backend for backend, result in results.items() if result != expected]
+    for backend in mismatch:
+        print("  MISMATCH(%s): %r\n    expected: %r" % (backend, results[backend], expected))
+    return not mismatch
+
+
+async def capture(site, board):
+    """Save the first list page of a board, its first post and the comments of the post into pages/.
+    """
+    cls = get_streamer(site)
+    streamer = cls({cls.board_key: board, 'page_interval': 0, 'include_comments': 1})
+    responses = {}
+    request = streamer.request
+
+    async def recording_request(url, conditional=False):
+        responses[url] = await request(url, conditional)
+        return responses[url]
+    streamer.request = recording_request
+
+    try:
+        entries = [entry async for entry in streamer.get_post_list(board, 1, 1, conditional=False)]
+        if not entries:
+            raise ValueError("No post found in the first page of %s:%s" % (site, board))
+        list_url = list(responses)[-1]
+        await streamer.fetch_post(entries[0]['url'], skip_crawled=False)
+    finally:
+        await streamer.close()
+
+    saved = []
+    for url, text in responses.items():
+        if url == list_url:
+            kind, ext = 'list', 'html'
+        elif url == entries[0]['url']:
+            kind, ext = 'post', 'html'
+        else:
+            kind, ext = 'comment', 'json'
+        path = os.path.join(PAGES, '%s_%s_%s.%s' % (site, board, kind, ext))
+        with open(path, 'w', encoding='UTF-8') as file:
+            file.write(text)
+        saved.append(path)
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capture', nargs='+', metavar='SITE:BOARD', help="save the pages of boards and exit")
+    parser.add_argument('--update', action='store_true', help="record the html5lib results as the expected ones")
+    args = parser.parse_args()
+
+    if args.capture:
+        for target in args.capture:
+            site, board = target.split(':', 1)
+            for path in asyncio.run(capture(site, board)):
+                print("Saved %s" % os.path.relpath(path))
+        return 0
+
+    ok = True
+    for filename in sorted(os.listdir(PAGES)):
+        print(filename)
+        ok = check_page(filename, args.update) and ok
+
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""Local fake DCInside/TodayHumor server for the throughput benchmark.
+
+Pages follow the markup of the parity corpus(examples/parser_parity/pages).
+Every board has `posts` posts(newest first, `per_page` per list page);
+the body of a post tells when it was first listed(`bench-listed-at <time>`) to measure end-to-end latency.
+"""
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+
+BASE_TIME = datetime(2022, 1, 11, 12, 0, 0)
+FIRST_POST_NO = 1000000
+
+DC_LIST = '''<!DOCTYPE html>
+<html lang="ko">
+<head><meta charset="UTF-8"><title>{board} 갤러리 - 커뮤니티 포털 디시인사이드</title>
+<script type="text/javascript">var _GALLERY_TYPE_ = "G"; if (a < b && b > c) {{ document.write("<div>"); }}</script>
+</head>
+<body>
+<div id="top" class="dcwrap width1160"><header class="dcheader"><h1><a href="/">디시인사이드</a></h1></header></div>
+<div class="gall_listwrap list">
+  <table class="gall_list">
+    <thead><tr><th scope="col" class="gall_num">번호</th><th scope="col" class="gall_tit">제목</th><th scope="col" class="gall_writer">글쓴이</th><th scope="col" class="gall_date">작성일</th></tr></thead>
+    <tbody class="listwrap2">
+{rows}
+    </tbody>
+  </table>
+</div>
+</body>
+</html>
+'''
+
+DC_ROW = '''      <tr class="ub-content us-post" data-no="{no}" data-type="icon_txt">
+        <td class="gall_num">{no}</td>
+        <td class="gall_tit ub-word"><a href="/board/view/?id={board}&amp;no={no}&amp;page={page}"><em class="icon_img icon_txt"></em>벤치마크 글 {no}</a></td>
+        <td class="gall_writer ub-writer" data-nick="ㅇㅇ" data-uid="" data-ip="118.235"><span class="nickname"><em>ㅇㅇ</em></span><span class="ip">(118.235)</span></td>
+        <td class="gall_date" title="{timestamp}">{time}</td>
+        <td class="gall_count">57</td><td class="gall_recommend">2</td>
+      </tr>'''
+
+DC_POST = '''<!DOCTYPE html>
+<html lang="ko">
+<head><meta charset="UTF-8"><title>벤치마크 글 {no} - {board} 갤러리</title></head>
+<body>
+<div class="dcwrap width1160">
+<main id="container" class="clear gallery_view">
+<div class="view_content_wrap">
+  <header>
+    <div class="gallview_head clear ub-content">
+      <h3 class="title ub-word"><span class="title_headtext"></span> <span class="title_subject">벤치마크 글 {no}</span></h3>
+      <div class="gall_writer ub-writer" data-nick="ㅇㅇ" data-uid="" data-ip="118.235" data-loc="view">
+        <div class="fl"><span class="nickname"><em>ㅇㅇ</em></span><span class="ip">(118.235)</span><span class="gall_date" title="{timestamp}">{dotted}</span></div>
+        <div class="fr"><span class="gall_count">조회 57</span><span class="gall_reply_num">추천 2</span><span class="gall_comment"><a href="#focus_cmt">댓글 {comments}</a></span></div>
+      </div>
+    </div>
+  </header>
+  <div class="gallview_contents">
+    <div class="inner clear">
+      <div class="writing_view_box">
+        <div class="write_div" style="overflow:hidden;width:900px;">
+{paragraphs}
+          <p>bench-listed-at {listed_at}</p>
+        </div>
+      </div>
+    </div>
+    <div class="btn_recommend_box clear">
+      <div class="inner_box">
+        <div class="up_num_box"><p class="up_num">2</p></div>
+        <div class="down_num_box"><p class="down_num">0</p></div>
+      </div>
+    </div>
+  </div>
+</div>
+</main>
+</div>
+</body>
+</html>
+'''
+
+TH_LIST = '''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html>
+<head><meta http-equiv="Content-Type" content="text/html; charset=utf-8" /><title>오늘의유머 - {board}</title></head>
+<body>
+<div class="whole_box">
+<div class="vertical_container">
+<table class="table_list">
+  <tr><th>번호</th><th></th><th>제목</th><th>이름</th><th>날짜</th><th>조회</th><th>추천</th></tr>
+{rows}
+</table>
+</div>
+</div>
+</body>
+</html>
+'''
+
+TH_ROW = '''  <tr class="view list_tr_{board}" mn="441122">
+    <td class="no"><a href="/board/view.php?table={board}&no={no}&s_no={no}&page={page}" target="_top">{no}</a></td>
+    <td class="icon"><img src="//www.todayhumor.co.kr/board/images/list_icon_animal.gif" alt="" /></td>
+    <td class="subject"><a href="/board/view.php?table={board}&no={no}&s_no={no}&page={page}" target="_top">벤치마크 글 {no}</a></td>
+    <td class="name"><a href="#" onclick="return false;">멍멍이주인</a></td>
+    <td class="date">{short}</td>
+    <td class="hits">88</td>
+    <td class="oknok">5</td>
+  </tr>'''
+
+TH_POST = '''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html>
+<head><meta http-equiv="Content-Type" content="text/html; charset=utf-8" /><title>벤치마크 글 {no} - 오늘의유머</title></head>
+<body>
+<div class="whole_box">
+<div class="containerInner">
+  <div class="viewSubjectDiv">
+    <div style="line-height:40px;font-size:20px;"> 벤치마크 글 {no} </div>
+  </div>
+  <div class="writerInfoContainer">
+    <div class="writerInfoContents">
+      <div>게시물ID : {board}_{no}</div>
+      <div>작성자 : <span id="viewPageWriterNameSpan" mn="441122" name="멍멍이주인" style="cursor:pointer;">멍멍이주인</span></div>
+      <div>추천 : <span class="view_ok_nok">5</span></div>
+      <div>조회수 : 88</div>
+      <div>IP : 175.223.***.51</div>
+      <div>댓글 : {comments}개</div>
+      <div>등록시간 : {slashed}</div>
+    </div>
+  </div>
+  <div class="viewContent">
+{paragraphs}
+    <div>bench-listed-at {listed_at}</div>
+  </div>
+</div>
+</div>
+</body>
+</html>
+'''
+
+
+class FakeSite(object):
+    """aiohttp application serving the fake boards.
+
+    Args:
+        posts (int): posts per board.
+        per_page (int): posts per list page.
+        comments (int): comments per post(DCInside comment API).
+        paragraphs (int): paragraphs of a post body.
+        latency, jitter (float): seconds added to every response(latency + uniform(0, jitter)).
+        stall_rate (float): fraction of responses delayed by `stall` seconds(timeouts of the client).
+        error_rate (float): fraction of responses replaced by 503 Service Unavailable.
+    """
+
+    def __init__(self, posts=500, per_page=50, comments=3, paragraphs=10,
+                 latency=0.0, jitter=0.0, stall_rate=0.0, stall=10.0, error_rate=0.0, seed=0):
+        self.posts = posts
+        self.per_page = per_page
+        self.comments = comments
+        self.paragraphs = paragraphs
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+        self._listed_at = {}  # (board, post_no) -> first time listed
+        self.stats = {'requests': 0, 'stalls': 0, 'errors': 0}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/board/lists', self.dc_list)
+        app.router.add_get('/board/view/', self.dc_post)
+        app.router.add_get('/api/comment_new.php', self.dc_comments)
+        app.router.add_get('/board/list.php', self.th_list)
+        app.router.add_get('/board/view.php', self.th_post)
+        app.router.add_get('/stats', self.get_stats)
+        return app
+
+    async def _delay(self):
+        """Latency & fault injection; return an error response or None.
+        """
+        self.stats['requests'] += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if self._random.random() < self.stall_rate:
+            self.stats['stalls'] += 1
+            delay += self.stall
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=503, text='<html><body>Service Unavailable</body></html>', content_type='text/html')
+        return None
+
+    def _page_posts(self, board, page):
+        first = (page - 1) * self.per_page
+        now = time.time()
+        for index in range(first, min(first + self.per_page, self.posts)):
+            no = FIRST_POST_NO + self.posts - index
+            self._listed_at.setdefault((board, no), now)
+            yield no, BASE_TIME - timedelta(minutes=index)
+
+    def _paragraphs(self, tag, no):
+        return '\n'.join(
+            '          <%s>벤치마크 본문 %d-%d &lt;테스트&gt; 문단입니다&nbsp;ㅋㅋ</%s>' % (tag, no, i, tag)
+            for i in range(self.paragraphs)
+        )
+
+    async def dc_list(self, request):
+        error = await self._delay()
+        if error is not None:
+            return error
+        board, page = request.query['id'], int(request.query.get('page', 1))
+        rows = '\n'.join(
+            DC_ROW.format(board=board, no=no, page=page,
+                          timestamp=written_at.strftime("%Y-%m-%d %H:%M:%S"), time=written_at.strftime("%H:%M"))
+            for no, written_at in self._page_posts(board, page)
+        )
+        return web.Response(text=DC_LIST.format(board=board, rows=rows), content_type='text/html')
+
+    async def dc_post(self, request):
+        error = await self._delay()
+        if error is not None:
+            return error
+        board, no = request.query['id'], int(request.query['no'])
+        written_at = BASE_TIME - timedelta(minutes=FIRST_POST_NO + self.posts - no)
+        return web.Response(text=DC_POST.format(
+            board=board, no=no, comments=self.comments,
+            timestamp=written_at.strftime("%Y-%m-%d %H:%M:%S"), dotted=written_at.strftime("%Y.%m.%d %H:%M:%S"),
+            paragraphs=self._paragraphs('p', no), listed_at=self._listed_at.get((board, no), time.time()),
+        ), content_type='text/html')
+
+    async def dc_comments(self, request):
+        error = await self._delay()
+        if error is not None:
+            return error
+        comment_list = [{
+            'user_id': '', 'ipData': '118.235', 'name': 'ㅇㅇ',
+            'date_time': BASE_TIME.strftime("%Y.%m.%d %H:%M"),
+            'comment_memo': '벤치마크 댓글 %d<br>둘째 줄' % i,
+        } for i in range(self.comments)]
+        return web.Response(text=json.dumps([{'comment_list': comment_list}]), content_type='application/json')
+
+    async def th_list(self, request):
+        error = await self._delay()
+        if error is not None:
+            return error
+        board, page = request.query['table'], int(request.query.get('page', 1))
+        rows = '\n'.join(
+            TH_ROW.format(board=board, no=no, page=page, short=written_at.strftime("%y/%m/%d %H:%M"))
+            for no, written_at in self._page_posts(board, page)
+        )
+        return web.Response(text=TH_LIST.format(board=board, rows=rows), content_type='text/html')
+
+    async def th_post(self, request):
+        error = await self._delay()
+        if error is not None:
+            return error
+        board, no = request.query['table'], int(request.query['no'])
+        written_at = BASE_TIME - timedelta(minutes=FIRST_POST_NO + self.posts - no)
+        return web.Response(text=TH_POST.format(
+            board=board, no=no, comments=self.comments, slashed=written_at.strftime("%Y/%m/%d %H:%M:%S"),
+            paragraphs=self._paragraphs('div', no), listed_at=self._listed_at.get((board, no), time.time()),
+        ), content_type='text/html')
+
+    async def get_stats(self, request):
+        return web.json_response(self.stats)
+
+
+def serve(host, port, **kwargs):
+    """Run a FakeSite until terminated(target of the benchmark's server process).
+    """
+    web.run_app(FakeSite(**kwargs).app(), host=host, port=port, print=None, access_log=None)
@@ -0,0 +1,177 @@
+"""Offline throughput benchmark of a Birdman process.
+
+Runs DCInsideStreamer or TodayHumorStreamer end to end(Birdman, scheduler, listener)
+against a local fake server(fakesite.py) in another process, with page_interval zeroed,
+and prints the results as JSON: posts/s, end-to-end latency(first listed -> listener) p50/p99,
+parse CPU time and peak RSS. Run from the repository root, e.g.:
+
+    python examples/throughput_benchmark/main.py --site dcinside --boards 8 --posts 500 --markup lxml
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import resource
+import signal
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fakesite
+
+from birdman import Birdman
+from birdman.listen.base import BaseListener
+from birdman.stream.active import ActiveStreamer
+from birdman.stream.dcinside import DCInsideStreamer
+from birdman.stream.todayhumor import TodayHumorStreamer
+
+
+class BenchmarkListener(BaseListener):
+    """Counts the posts and their end-to-end latency; stops Birdman after `expected` posts.
+    """
+
+    def __init__(self, expected):
+        super(BenchmarkListener, self).__init__({})
+        self.expected = expected
+        self.latencies = []
+        self.first_at = None
+        self.last_at = None
+
+    def listen(self, result):
+        now = time.time()
+        match = re.search(r'bench-listed-at ([0-9.]+)', result.get('body', ''))
+        if match is not None:
+            self.latencies.append(now - float(match.group(1)))
+        self.first_at = self.first_at or now
+        self.last_at = now
+        if len(self.latencies) >= self.expected:
+            # Same as Ctrl-C; Birdman closes every streamer and listener
+            raise KeyboardInterrupt()
+
+    def close(self):
+        pass
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def make_streamers(args, base_url):
+    streamers = []
+    for index in range(args.boards):
+        obj = {
+            'current_post_id': 0,
+            'current_datetime': "0000-00-00T00:00:00",
+            'page_interval': 0,
+            'recrawl_interval': 86400,
+            'conditional_get': 0,
+            'timeout': args.timeout,
+            'retry_backoff': args.retry_backoff,
+            'markup': args.markup,
+            'fetch_concurrency': args.fetch_concurrency,
+            'include_comments': int(args.comments > 0),
+        }
+        if args.site == 'dcinside':
+            streamer = DCInsideStreamer({**obj, 'gallery_id': 'bench%d' % index})
+            streamer._lists_url = base_url + '/board/lists'
+            streamer._comment_api_url = base_url + '/api/comment_new.php'
+        else:
+            streamer = TodayHumorStreamer({**obj, 'board_id': 'bench%d' % index})
+            streamer._lists_url = base_url + '/board/list.php'
+        streamer._view_url = base_url
+        streamers.append(streamer)
+    return streamers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--site', choices=['dcinside', 'todayhumor'], default='dcinside')
+    parser.add_argument('--boards', type=int, default=4)
+    parser.add_argument('--posts', type=int, default=200, help="posts per board")
+    parser.add_argument('--per-page', type=int, default=50)
+    parser.add_argument('--comments', type=int, default=3, help="comments per post(DCInside)")
+    parser.add_argument('--paragraphs', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds per response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra uniform seconds per response")
+    parser.add_argument('--stall-rate', type=float, default=0.0, help="fraction of responses stalled past --timeout")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument('--timeout', type=float, default=2.0)
+    parser.add_argument('--retry-backoff', type=float, default=0.1, help="seconds before the first retry of a request")
+    parser.add_argument('--markup', default='html.parser')
+    parser.add_argument('--fetch-concurrency', type=int, default=4)
+    parser.add_argument('--parse-workers', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=16, help="scheduler workers")
+    parser.add_argument('--max-seconds', type=float, default=300)
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--output', default=None, help="write the JSON result to this file")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=fakesite.serve, args=('127.0.0.1', args.port), kwargs={
+        'posts': args.posts, 'per_page': args.per_page, 'comments': args.comments, 'paragraphs': args.paragraphs,
+        'latency': args.latency, 'jitter': args.jitter, 'stall_rate': args.stall_rate,
+        'stall': args.timeout * 2, 'error_rate': args.error_rate,
+    }, daemon=True)
+    server.start()
+    base_url = 'http://127.0.0.1:%d' % args.port
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(base_url + '/stats')
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    expected = args.boards * args.posts
+    listener = BenchmarkListener(expected)
+    birdman = Birdman(make_streamers(args, base_url), [listener], {
+        'scheduler': {'workers': args.workers, 'spread': 0},
+        'parse_workers': args.parse_workers,
+    })
+    # Give up after --max-seconds(e.g. posts lost by --error-rate)
+    deadline = threading.Timer(args.max_seconds, os.kill, (os.getpid(), signal.SIGINT))
+    deadline.daemon = True
+
+    cpu_started = time.process_time()
+    started = time.time()
+    deadline.start()
+    birdman.start()
+    elapsed = (listener.last_at or time.time()) - started
+    deadline.cancel()
+
+    stats = json.load(urllib.request.urlopen(base_url + '/stats'))
+    server.terminate()
+
+    parse_stats = [streamer.parse_stats for streamer in birdman._streamers if isinstance(streamer, ActiveStreamer)]
+    result = {
+        'site': args.site,
+        'markup': args.markup,
+        'boards': args.boards,
+        'posts_expected': expected,
+        'posts': len(listener.latencies),
+        'elapsed': elapsed,
+        'posts_per_second': len(listener.latencies) / elapsed if elapsed > 0 else None,
+        'latency_p50': percentile(listener.latencies, 50),
+        'latency_p99': percentile(listener.latencies, 99),
+        'parse_calls': sum(stat['calls'] for stat in parse_stats),
+        'parse_cpu_time': sum(stat['cpu_time'] for stat in parse_stats),
+        'process_cpu_time': time.process_time() - cpu_started,
+        # KB on Linux
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'peak_rss_children_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        'server': stats,
+    }
+    output = json.dumps(result, indent=2)
+    if args.output is not None:
+        with open(args.output, 'w', encoding='UTF-8') as file:
+            file.write(output + '\n')
+    print(output)
+    return 0 if result['posts'] == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())